@@ -1,13 +1,25 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import math
+import os
+import tempfile
 from datetime import datetime
-from typing import Dict, List
+from typing import AsyncIterator, Dict, Iterator, List, Optional
 
-from fastapi import FastAPI, HTTPException
+import httpx
+from fastapi import FastAPI, Header, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
 
 from config import settings
 from models.anomaly_detector import AnomalyDetector
+from models.backfill import Backfill, backend_points, range_source, upload_points
 from models.offline_monitor import OfflineMonitor
 from models.optimizer import ProcessOptimizer
 from models.parameter_forecaster import ParameterForecaster
@@ -15,12 +27,24 @@ from models.predictive_maintenance import PredictiveMaintenanceModel
 from schemas import (
     AlertPayload,
     AnomalyRequest,
+    BackfillOptions,
+    BackfillRequest,
+    ComponentTelemetry,
     MaintenanceRequest,
     OfflineEvaluationRequest,
     OptimizationRequest,
     ParameterEvaluationRequest,
+    ParameterSweepRequest,
+    ProfileRequest,
+    StreamingStateExportRequest,
+    StreamingStateImportRequest,
 )
+from utils.batching import MicroBatcher
 from utils.data_client import backend_client
+from utils.profiling import SamplingProfiler
+from utils.recordings import FORMATS
+from utils.scheduling import ANALYTICS, INTERACTIVE, SAFETY, PriorityScheduler
+from utils.tracing import TracingMiddleware, attach_debug, mark, span
 
 app = FastAPI(
     title=settings.app_name,
@@ -35,8 +59,29 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
 
+
+@app.exception_handler(RequestValidationError)
+async def validation_error(_: Request, exc: RequestValidationError) -> JSONResponse:
+    # Errors echo the rejected input, and strict JSON cannot carry an inf/NaN one.
+    return JSONResponse(status_code=422, content={"detail": _json_safe(jsonable_encoder(exc.errors()))})
+
+
+def _json_safe(value):
+    if isinstance(value, float) and not math.isfinite(value):
+        return str(value)
+    if isinstance(value, dict):
+        return {key: _json_safe(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_json_safe(item) for item in value]
+    return value
+
+
+profiler = SamplingProfiler(os.path.dirname(os.path.abspath(__file__)))
+app.add_middleware(TracingMiddleware, enabled=settings.tracing_enabled, profiler=profiler)
+
 anomaly_detector = AnomalyDetector()
 maintenance_model = PredictiveMaintenanceModel()
 optimizer = ProcessOptimizer()
@@ -44,6 +89,42 @@ offline_monitor = OfflineMonitor()
 parameter_forecaster = ParameterForecaster()
 recent_alerts: List[Dict] = []
 
+scheduler = PriorityScheduler(
+    workers=settings.scheduler_workers,
+    reserved_safety=settings.scheduler_safety_reserved,
+    analytics_limit=settings.scheduler_analytics_limit,
+    max_pause_ms=settings.scheduler_max_pause_ms,
+)
+
+anomaly_batcher = MicroBatcher(
+    "anomaly",
+    anomaly_detector.detect_batch,
+    window_ms=settings.batch_window_ms,
+    max_batch_size=settings.batch_max_size,
+    size_of=lambda request: len(request.components),
+    scheduler=scheduler if settings.scheduler_enabled else None,
+)
+parameter_batcher = MicroBatcher(
+    "parameter",
+    parameter_forecaster.evaluate_batch,
+    window_ms=settings.batch_window_ms,
+    max_batch_size=settings.batch_max_size,
+    size_of=lambda request: len(request.evaluations),
+    scheduler=scheduler if settings.scheduler_enabled else None,
+)
+
+
+async def _schedule(priority: int, fn, request) -> Dict:
+    if settings.scheduler_enabled:
+        return await scheduler.run(priority, fn, request)
+    return await run_in_threadpool(fn, request)
+
+
+def _respond(response) -> Dict:
+    with span("serialize"):
+        payload = response.model_dump()
+    return attach_debug(payload)
+
 
 @app.get("/health")
 def health() -> Dict[str, object]:
@@ -64,6 +145,11 @@ def model_status() -> Dict:
         "success": True,
         "models": [
             {"id": "anomaly_detector_v1", "status": "ready"},
+            {
+                "id": "streaming_anomaly_v1",
+                "status": "ready",
+                "trackedComponents": len(anomaly_detector.streaming),
+            },
             {"id": "predictive_maintenance_v1", "status": "ready"},
             {"id": "process_optimizer_v1", "status": "ready"},
         ],
@@ -71,47 +157,249 @@ def model_status() -> Dict:
     }
 
 
+@app.get("/ai/batching/stats")
+def batching_stats() -> Dict:
+    return {
+        "success": True,
+        "enabled": settings.batching_enabled,
+        "batchers": [anomaly_batcher.stats(), parameter_batcher.stats()],
+        "timestamp": datetime.utcnow().isoformat(),
+    }
+
+
+@app.get("/ai/scheduler/stats")
+def scheduler_stats() -> Dict:
+    return {
+        "success": True,
+        "enabled": settings.scheduler_enabled,
+        **scheduler.stats(),
+        "timestamp": datetime.utcnow().isoformat(),
+    }
+
+
 @app.post("/ai/anomaly/detect")
-def detect_anomalies(request: AnomalyRequest) -> Dict:
+async def detect_anomalies(request: AnomalyRequest) -> Dict:
+    mark("parse")
+    if not settings.batching_enabled:
+        return await _schedule(INTERACTIVE, _detect_anomalies, request)
+    # The batcher runs the model on its own thread and counts the request as
+    # interactive work; awaiting it here keeps scheduler workers free so
+    # concurrent callers can share one batch.
+    components = request.components or await run_in_threadpool(backend_client.fetch_recent_components)
+    response = await anomaly_batcher.submit_async(_anomaly_request(request, components))
+    return await run_in_threadpool(_respond, response)
+
+
+def _detect_anomalies(request: AnomalyRequest) -> Dict:
     components = request.components or backend_client.fetch_recent_components()
+    response = anomaly_detector.detect(_anomaly_request(request, components))
+    return _respond(response)
+
+
+def _anomaly_request(request: AnomalyRequest, components: List[ComponentTelemetry]) -> AnomalyRequest:
     if not components:
         raise HTTPException(status_code=400, detail="No telemetry available for anomaly detection")
-    response = anomaly_detector.detect(AnomalyRequest(components=components))
-    return response.model_dump()
+    return request.model_copy(update={"components": components})
 
 
 @app.post("/ai/maintenance/predict")
-def predict_maintenance(request: MaintenanceRequest) -> Dict:
+async def predict_maintenance(request: MaintenanceRequest) -> Dict:
+    mark("parse")
+    return await _schedule(ANALYTICS, _predict_maintenance, request)
+
+
+def _predict_maintenance(request: MaintenanceRequest) -> Dict:
     components = request.components or backend_client.fetch_recent_components()
     if not components:
         raise HTTPException(status_code=400, detail="No telemetry available for maintenance prediction")
-    response = maintenance_model.predict(MaintenanceRequest(components=components, lookaheadHours=request.lookaheadHours))
-    return response.model_dump()
+    response = maintenance_model.predict(request.model_copy(update={"components": components}))
+    return _respond(response)
 
 
 @app.post("/ai/optimize")
-def optimise(request: OptimizationRequest) -> Dict:
+async def optimise(request: OptimizationRequest) -> Dict:
+    mark("parse")
+    return await _schedule(ANALYTICS, _optimise, request)
+
+
+def _optimise(request: OptimizationRequest) -> Dict:
     components = request.components or backend_client.fetch_recent_components()
     if not components:
         raise HTTPException(status_code=400, detail="No telemetry available for optimisation")
-    response = optimizer.optimise(OptimizationRequest(components=components, objective=request.objective, horizonMinutes=request.horizonMinutes))
-    return response.model_dump()
+    with span("optimize"):
+        response = optimizer.optimise(
+            OptimizationRequest(components=components, objective=request.objective, horizonMinutes=request.horizonMinutes)
+        )
+    return _respond(response)
 
 
 @app.post("/ai/offline/evaluate")
-def evaluate_offline(request: OfflineEvaluationRequest) -> Dict:
+async def evaluate_offline(request: OfflineEvaluationRequest) -> Dict:
+    mark("parse")
+    return await _schedule(SAFETY, _evaluate_offline, request)
+
+
+def _evaluate_offline(request: OfflineEvaluationRequest) -> Dict:
     if not request.components:
         raise HTTPException(status_code=400, detail="No components provided for offline evaluation")
-    response = offline_monitor.evaluate(request)
-    return response.model_dump()
+    with span("offline.evaluate"):
+        response = offline_monitor.evaluate(request)
+    return _respond(response)
 
 
 @app.post("/ai/parameter/evaluate")
-def evaluate_parameter(request: ParameterEvaluationRequest) -> Dict:
+async def evaluate_parameter(request: ParameterEvaluationRequest) -> Dict:
+    mark("parse")
     if not request.evaluations:
         raise HTTPException(status_code=400, detail="No parameter evaluations provided")
-    response = parameter_forecaster.evaluate(request)
-    return response.model_dump()
+    if settings.batching_enabled:
+        response = await parameter_batcher.submit_async(request)
+        return await run_in_threadpool(_respond, response)
+    return await _schedule(INTERACTIVE, _evaluate_parameter, request)
+
+
+def _evaluate_parameter(request: ParameterEvaluationRequest) -> Dict:
+    with span("parameter.evaluate"):
+        response = parameter_forecaster.evaluate(request)
+    return _respond(response)
+
+
+@app.post("/ai/parameter/sweep")
+async def sweep_parameters(request: ParameterSweepRequest) -> JSONResponse:
+    mark("parse")
+    return await _schedule(INTERACTIVE, _sweep_parameters, request)
+
+
+def _sweep_parameters(request: ParameterSweepRequest) -> JSONResponse:
+    with span("parameter.sweep"):
+        try:
+            response = parameter_forecaster.sweep(request)
+        except ValueError as exc:
+            raise HTTPException(status_code=422, detail=str(exc)) from exc
+    # Curves are plain lists of numbers; skip FastAPI's per-element jsonable_encoder pass.
+    return JSONResponse(_respond(response))
+
+
+@app.post("/ai/backfill")
+async def backfill_range(request: BackfillRequest) -> StreamingResponse:
+    mark("parse")
+    # The backend buffer rolls between requests, so range cursors resume by timestamp.
+    backfill = Backfill(backend_points(request), range_source(request), request, by_timestamp=True)
+    return await _stream_backfill(backfill)
+
+
+@app.post("/ai/backfill/upload")
+async def backfill_upload(
+    request: Request,
+    models: str = "anomaly",
+    chunkSize: Optional[int] = None,
+    minSeverity: Optional[str] = None,
+    history: int = 20,
+    cursor: Optional[str] = None,
+    fmt: Optional[str] = Query(default=None, alias="format"),
+) -> StreamingResponse:
+    try:
+        options = BackfillOptions(
+            models=[name.strip() for name in models.split(",") if name.strip()],
+            chunkSize=chunkSize,
+            minSeverity=minSeverity,
+            history=history,
+            cursor=cursor,
+        )
+    except ValidationError as exc:
+        raise RequestValidationError(exc.errors()) from exc
+    if fmt is not None and fmt not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown format '{fmt}' (expected one of {', '.join(FORMATS)})")
+
+    # Large uploads spill to disk, so the body never has to fit in memory.
+    spool = tempfile.SpooledTemporaryFile(max_size=settings.backfill_spool_bytes)
+    digest = hashlib.blake2b(digest_size=8)
+    async for data in request.stream():
+        digest.update(data)
+        spool.write(data)
+    mark("parse")
+    if not spool.tell():
+        spool.close()
+        raise HTTPException(status_code=400, detail="No telemetry uploaded for backfill")
+
+    source = "upload:" + digest.hexdigest()
+    return await _stream_backfill(Backfill(upload_points(spool, fmt), source, options))
+
+
+async def _stream_backfill(backfill: Backfill) -> StreamingResponse:
+    # Opening the source and skipping to the cursor happen before the first line,
+    # so bad cursors and unreachable sources still get a proper status code.
+    lines = backfill.lines()
+    try:
+        first = await _schedule(ANALYTICS, _next_line, lines)
+    except httpx.HTTPError as exc:
+        raise HTTPException(status_code=502, detail=f"Backend telemetry unavailable: {exc}") from exc
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return StreamingResponse(_drain(first, lines), media_type="application/x-ndjson")
+
+
+async def _drain(first: str, lines: Iterator[str]) -> AsyncIterator[str]:
+    # One scheduled analytics job per chunk. If the client goes away, the generator
+    # (and its source) is closed once the in-flight chunk drops its reference.
+    yield first
+    while True:
+        line = await _schedule(ANALYTICS, _next_line, lines)
+        if line is None:
+            return
+        yield line
+
+
+def _next_line(lines: Iterator[str]) -> Optional[str]:
+    return next(lines, None)
+
+
+@app.get("/ai/streaming/state")
+def streaming_state() -> Dict:
+    return {"success": True, "componentIds": anomaly_detector.streaming.keys()}
+
+
+@app.post("/ai/streaming/state/export")
+def export_streaming_state(request: StreamingStateExportRequest) -> Dict:
+    engine = anomaly_detector.streaming
+    keys = request.componentIds if request.componentIds is not None else engine.keys()
+    states = engine.export_state(keys, remove=request.remove)
+    return {
+        "success": True,
+        "states": {key: {"mean": mean, "mad": mad, "count": count} for key, (mean, mad, count) in states.items()},
+    }
+
+
+@app.post("/ai/streaming/state/import")
+def import_streaming_state(request: StreamingStateImportRequest) -> Dict:
+    imported = anomaly_detector.streaming.import_state(
+        {key: (state.mean, state.mad, state.count) for key, state in request.states.items()}
+    )
+    return {"success": True, "imported": imported}
+
+
+def _require_debug(token: Optional[str]) -> None:
+    if not settings.debug_endpoints:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if settings.debug_token and token != settings.debug_token:
+        raise HTTPException(status_code=403, detail="Invalid debug token")
+
+
+@app.post("/debug/profile")
+async def start_profile(request: ProfileRequest, x_debug_token: Optional[str] = Header(default=None)) -> Dict:
+    _require_debug(x_debug_token)
+    profiler.arm(request.requests, request.intervalMs)
+    if request.waitSeconds:
+        deadline = asyncio.get_running_loop().time() + request.waitSeconds
+        while not profiler.complete and asyncio.get_running_loop().time() < deadline:
+            await asyncio.sleep(0.05)
+    return {"success": True, "report": profiler.report(request.limit)}
+
+
+@app.get("/debug/profile")
+def profile_report(limit: int = 25, x_debug_token: Optional[str] = Header(default=None)) -> Dict:
+    _require_debug(x_debug_token)
+    return {"success": True, "report": profiler.report(limit)}
 
 
 @app.post("/ai/alerts/range")
@@ -0,0 +1,97 @@
+"""Compare points/second and memory of the IsolationForest and streaming anomaly engines.
+
+Run from ``cedd/ai-service``::
+
+    python -m benchmarks.anomaly_engines --components 100000 --points 5
+"""
+from __future__ import annotations
+
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+
+from models.anomaly_detector import ISOLATION_FOREST, STREAMING, AnomalyDetector
+from models.streaming_detector import StreamingAnomalyEngine
+from schemas import AnomalyRequest, ComponentTelemetry
+
+
+def _telemetry(rng: np.random.Generator, components: int) -> AnomalyRequest:
+    values = rng.normal(50.0, 5.0, components)
+    return AnomalyRequest(
+        components=[
+            ComponentTelemetry(
+                name=f"component-{index}",
+                value=float(value),
+                metadata={"historyMean": 50.0, "historyStd": 5.0},
+            )
+            for index, value in enumerate(values)
+        ]
+    )
+
+
+def _run(name: str, requests, score) -> dict:
+    tracemalloc.start()
+    started = time.perf_counter()
+    for request in requests:
+        score(request)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    points = sum(len(request.components) for request in requests)
+    return {"engine": name, "points": points, "seconds": elapsed, "peak_bytes": peak}
+
+
+def bench_detector(engine: str, requests) -> dict:
+    detector = AnomalyDetector()
+    detector.default_engine = engine
+    return _run(f"detect[{engine}]", requests, detector.detect)
+
+
+def bench_streaming_engine(requests) -> dict:
+    engine = StreamingAnomalyEngine()
+
+    def score(request: AnomalyRequest) -> None:
+        for component in request.components:
+            engine.update(component.name, component.value)
+
+    result = _run("streaming.update", requests, score)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    sized = StreamingAnomalyEngine()
+    for component in requests[0].components:
+        sized.update(component.name, component.value)
+    result["state_bytes_per_component"] = (tracemalloc.get_traced_memory()[0] - before) / max(len(sized), 1)
+    tracemalloc.stop()
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--components", type=int, default=10000)
+    parser.add_argument("--points", type=int, default=5, help="points streamed per component")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    requests = [_telemetry(rng, args.components) for _ in range(args.points)]
+
+    results = (
+        bench_detector(ISOLATION_FOREST, requests),
+        bench_detector(STREAMING, requests),
+        bench_streaming_engine(requests),
+    )
+    for result in results:
+        rate = result["points"] / result["seconds"] if result["seconds"] else float("inf")
+        line = (
+            f"{result['engine']:<26} {result['points']:>9} pts  {rate:>12,.0f} pts/s  "
+            f"peak {result['peak_bytes'] / 1e6:8.2f} MB"
+        )
+        if "state_bytes_per_component" in result:
+            line += f"  state {result['state_bytes_per_component']:.0f} B/component"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,6 @@
 from functools import lru_cache
+from typing import Dict
+
 from pydantic import Field
 from pydantic_settings import BaseSettings
 
@@ -8,9 +10,35 @@ class Settings(BaseSettings):
     api_version: str = "0.1.0"
     backend_base_url: str = Field("http://localhost:3000", env="BACKEND_BASE_URL")
     telemetry_limit: int = Field(250, env="TELEMETRY_LIMIT")
-    anomaly_default_threshold: float = Field(0.7, env="ANOMALY_THRESHOLD")
+    anomaly_default_threshold: float = Field(0.7, validation_alias="ANOMALY_THRESHOLD")
+    anomaly_compiled_scorer: bool = Field(True, env="ANOMALY_COMPILED_SCORER")
+    anomaly_engine: str = Field("isolation_forest", env="ANOMALY_ENGINE")
+    anomaly_engine_by_type: Dict[str, str] = Field(default_factory=dict, env="ANOMALY_ENGINE_BY_TYPE")
+    streaming_alpha: float = Field(0.05, env="STREAMING_ALPHA")
+    streaming_warmup: int = Field(10, env="STREAMING_WARMUP")
+    streaming_clip: float = Field(3.0, env="STREAMING_CLIP")
+    streaming_z_scale: float = Field(4.0, env="STREAMING_Z_SCALE")
     maintenance_default_hours: int = Field(72, env="MAINTENANCE_LOOKAHEAD_HOURS")
     optimizer_default_horizon_minutes: int = Field(30, env="OPTIMIZER_HORIZON_MINUTES")
+    batching_enabled: bool = Field(True, env="BATCHING_ENABLED")
+    batch_window_ms: float = Field(5.0, env="BATCH_WINDOW_MS")
+    batch_max_size: int = Field(512, env="BATCH_MAX_SIZE")
+    scheduler_enabled: bool = Field(True, env="SCHEDULER_ENABLED")
+    scheduler_workers: int = Field(8, env="SCHEDULER_WORKERS")
+    scheduler_safety_reserved: int = Field(2, env="SCHEDULER_SAFETY_RESERVED")
+    scheduler_analytics_limit: int = Field(2, env="SCHEDULER_ANALYTICS_LIMIT")
+    scheduler_max_pause_ms: float = Field(50.0, ge=0, env="SCHEDULER_MAX_PAUSE_MS")
+    analytics_chunk_size: int = Field(256, gt=0, env="ANALYTICS_CHUNK_SIZE")
+    backfill_chunk_size: int = Field(256, gt=0, env="BACKFILL_CHUNK_SIZE")
+    backfill_spool_bytes: int = Field(8 * 1024 * 1024, env="BACKFILL_SPOOL_BYTES")
+    backfill_timeout_seconds: float = Field(30.0, env="BACKFILL_TIMEOUT_SECONDS")
+    tracing_enabled: bool = Field(False, env="TRACING_ENABLED")
+    debug_endpoints: bool = Field(False, env="DEBUG_ENDPOINTS")
+    debug_token: str = Field("", env="DEBUG_TOKEN")
+    shard_urls: str = Field("", env="SHARD_URLS")
+    shard_key: str = Field("component", env="SHARD_KEY")
+    shard_replicas: int = Field(128, env="SHARD_REPLICAS")
+    shard_timeout_seconds: float = Field(10.0, env="SHARD_TIMEOUT_SECONDS")
 
     class Config:
         env_file = ".env"
@@ -1,14 +1,28 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import List
+from typing import Dict, Iterable, List, Tuple, Union
 
 import numpy as np
 from sklearn.ensemble import IsolationForest
 
 from config import settings
-from schemas import AnomalyRequest, AnomalyResponse, AnomalyResult
+from models.compiled_forest import CompiledIsolationForest
+from models.streaming_detector import StreamingAnomalyEngine
+from schemas import (
+    AnomalyRequest,
+    AnomalyResponse,
+    AnomalyResult,
+    CompactAnomalyResponse,
+    ComponentTelemetry,
+)
 from utils.feature_engineering import build_feature_vector
+from utils.response_filters import SEVERITY_LEVELS, select, severity_codes
+from utils.tracing import span
+
+ISOLATION_FOREST = "isolation_forest"
+STREAMING = "streaming"
+ENGINES = {ISOLATION_FOREST, STREAMING}
 
 
 class AnomalyDetector:
@@ -18,28 +32,112 @@ class AnomalyDetector:
             contamination=0.05,
             random_state=42,
         )
+        self.compiled: CompiledIsolationForest | None = None
+        self.streaming = StreamingAnomalyEngine()
+        self.default_engine = settings.anomaly_engine
+        self.engine_by_type = {
+            component_type.lower(): engine
+            for component_type, engine in settings.anomaly_engine_by_type.items()
+        }
+        unknown = ({self.default_engine} | set(self.engine_by_type.values())) - ENGINES
+        if unknown:
+            raise ValueError(f"Unknown anomaly engine(s): {', '.join(sorted(unknown))}")
         self._baseline_fit()
 
     def _baseline_fit(self) -> None:
         # Fit with a trivial baseline so the model can score immediately.
         dummy = np.array([[0.0], [1.0], [-1.0]])
         self.model.fit(dummy)
+        self.refresh_scorer()
 
-    def detect(self, request: AnomalyRequest) -> AnomalyResponse:
-        results: List[AnomalyResult] = []
+    def refresh_scorer(self) -> None:
+        """Re-exports the fitted forest; call after every refit so both scorers agree."""
+        self.compiled = (
+            CompiledIsolationForest.from_estimator(self.model) if settings.anomaly_compiled_scorer else None
+        )
+
+    def detect(self, request: AnomalyRequest) -> AnomalyResponse | CompactAnomalyResponse:
+        with span("anomaly.score"):
+            z_scores, scores = self._score_components(request.components)
+        with span("anomaly.build"):
+            return self._build_response(request, z_scores, scores, datetime.utcnow().isoformat())
+
+    def detect_batch(
+        self, requests: List[AnomalyRequest]
+    ) -> List[Union[AnomalyResponse, CompactAnomalyResponse, Exception]]:
+        """Scores several requests with one model call and splits the results per request.
 
-        for component in request.components:
-            features = build_feature_vector(component)
-            score = float(-self.model.decision_function([[features.z_score]])[0])
-            severity = self._severity(score)
-            explanation = self._explain(component, features.z_score, score)
+        A request that fails gets its exception in place of a response, so the
+        batch never has to be re-run and streaming state is updated only once.
+        """
+        outcomes: List[Union[AnomalyResponse, CompactAnomalyResponse, Exception, None]] = [
+            None
+        ] * len(requests)
+        accepted: List[int] = []
+        components: List[ComponentTelemetry] = []
+        forest: Dict[int, float] = {}
+        # Features are built for every request before any streaming update, so a
+        # malformed request is rejected without touching state.
+        for position, request in enumerate(requests):
+            try:
+                features = self._forest_z_scores(request.components)
+            except Exception as exc:
+                outcomes[position] = exc
+                continue
+            forest.update((len(components) + index, z_score) for index, z_score in features.items())
+            components.extend(request.components)
+            accepted.append(position)
 
+        z_scores, scores = self._score_prepared(components, forest)
+        timestamp = datetime.utcnow().isoformat()
+
+        offset = 0
+        for position in accepted:
+            request = requests[position]
+            end = offset + len(request.components)
+            try:
+                outcomes[position] = self._build_response(
+                    request, z_scores[offset:end], scores[offset:end], timestamp
+                )
+            except Exception as exc:
+                outcomes[position] = exc
+            offset = end
+        return outcomes
+
+    def _build_response(
+        self,
+        request: AnomalyRequest,
+        z_scores: List[float],
+        scores: np.ndarray,
+        timestamp: str,
+    ) -> AnomalyResponse | CompactAnomalyResponse:
+        codes = self._severity_codes(scores)
+        selected = select(scores, codes, request.minSeverity, request.topK)
+
+        if request.compact:
+            return CompactAnomalyResponse(
+                success=True,
+                evaluated=len(request.components),
+                componentIds=[request.components[index].name for index in selected],
+                scores=np.round(scores[selected], 3).tolist(),
+                severityCodes=codes[selected].tolist(),
+                severityLevels=SEVERITY_LEVELS,
+                rawScores=scores[selected].tolist() if request.rawScores else None,
+                timestamp=timestamp,
+            )
+
+        # Prose is only rendered for the results that are actually returned.
+        results: List[AnomalyResult] = []
+        for index in selected:
+            component = request.components[index]
+            score = float(scores[index])
+            severity = SEVERITY_LEVELS[codes[index]]
             results.append(
                 AnomalyResult(
                     componentId=component.name,
                     score=round(score, 3),
                     severity=severity,
-                    explanation=explanation,
+                    explanation=self._explain(component, z_scores[index], score),
                     recommendations=self._recommend(component, severity),
                 )
             )
@@ -47,18 +145,60 @@ class AnomalyDetector:
         return AnomalyResponse(
             success=True,
             anomalies=results,
-            timestamp=datetime.utcnow().isoformat(),
+            rawScores=scores[selected].tolist() if request.rawScores else None,
+            timestamp=timestamp,
         )
 
-    def _severity(self, score: float) -> str:
+    def warm(self, components: Iterable[ComponentTelemetry]) -> None:
+        """Feeds points through the stateful streaming engine without scoring them, e.g. to resume a backfill."""
+        for component in components:
+            if self.engine_for(component) == STREAMING:
+                self.streaming.update(component.name, float(component.value or 0.0))
+
+    def engine_for(self, component: ComponentTelemetry) -> str:
+        if component.type and self.engine_by_type:
+            return self.engine_by_type.get(component.type.lower(), self.default_engine)
+        return self.default_engine
+
+    def _score_components(
+        self, components: List[ComponentTelemetry]
+    ) -> Tuple[List[float], np.ndarray]:
+        return self._score_prepared(components, self._forest_z_scores(components))
+
+    def _forest_z_scores(self, components: List[ComponentTelemetry]) -> Dict[int, float]:
+        """Feature z-scores of the forest-scored components, keyed by position."""
+        return {
+            index: build_feature_vector(component).z_score
+            for index, component in enumerate(components)
+            if self.engine_for(component) != STREAMING
+        }
+
+    def _score_prepared(
+        self, components: List[ComponentTelemetry], forest: Dict[int, float]
+    ) -> Tuple[List[float], np.ndarray]:
+        scores = np.zeros(len(components))
+        # The forest runs first: if it fails, no streaming state has changed yet.
+        if forest:
+            scores[list(forest)] = self._score(list(forest.values()))
+
+        z_scores: List[float] = []
+        for index, component in enumerate(components):
+            z_score = forest.get(index)
+            if z_score is None:
+                z_score, scores[index] = self.streaming.update(component.name, float(component.value or 0.0))
+            z_scores.append(z_score)
+        return z_scores, scores
+
+    def _score(self, z_scores: List[float]) -> np.ndarray:
+        if not z_scores:
+            return np.empty(0)
+        features = np.asarray(z_scores, dtype=float).reshape(-1, 1)
+        scorer = self.compiled or self.model
+        return -scorer.decision_function(features)
+
+    def _severity_codes(self, scores: np.ndarray) -> np.ndarray:
         threshold = settings.anomaly_default_threshold
-        if score >= threshold * 1.5:
-            return "critical"
-        if score >= threshold:
-            return "high"
-        if score >= threshold * 0.6:
-            return "medium"
-        return "low"
+        return severity_codes(scores, threshold * 0.6, threshold, threshold * 1.5)
 
     def _explain(self, component, z_score: float, score: float) -> str:
         direction = "above" if z_score > 0 else "below"
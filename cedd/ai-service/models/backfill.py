@@ -0,0 +1,313 @@
+from __future__ import annotations
+
+import base64
+import gzip
+import hashlib
+import io
+import json
+import time
+from itertools import chain
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from config import settings
+from models.anomaly_detector import AnomalyDetector
+from models.predictive_maintenance import ACTIONS, PredictiveMaintenanceModel
+from schemas import (
+    AnomalyRequest,
+    BackfillOptions,
+    BackfillRequest,
+    ComponentTelemetry,
+    MaintenanceRequest,
+)
+from utils.data_client import backend_client
+from utils.recordings import BACKEND_DUMP, HistoryEnricher, batches, iter_recording, point_timestamp
+from utils.response_filters import SEVERITY_LEVELS, select
+from utils.scheduling import preemptible
+
+ChunkResult = Dict[str, Any]
+# Component in progress and its last scored timestamp.
+Position = Tuple[str, float]
+
+
+class Backfill:
+    """Re-scores a stream of telemetry points chunk by chunk as NDJSON lines.
+
+    The stream is a ``start`` line, one ``chunk`` line per ``chunkSize`` points
+    with the results and a resume ``cursor``, then an ``end`` line. A failure
+    part-way through ends the stream with an ``error`` line carrying the cursor
+    of the last completed chunk. Memory is bounded by one chunk plus one history
+    window per component. Each backfill gets its own models, so the live
+    streaming-engine state is never touched.
+
+    Cursors resume by point count unless ``by_timestamp`` is set. A source that
+    can change between requests, such as the backend's rolling buffer, resumes
+    from the component in progress and its last scored timestamp instead. That
+    relies on the source being grouped per component in a stable order, as the
+    backend dump is.
+    """
+
+    def __init__(
+        self,
+        points: Iterable[ComponentTelemetry],
+        source: str,
+        options: BackfillOptions,
+        by_timestamp: bool = False,
+    ) -> None:
+        self.points = points
+        self.source = source
+        self.models = list(dict.fromkeys(options.models))
+        self.chunk_size = options.chunkSize or settings.backfill_chunk_size
+        self.min_severity = options.minSeverity
+        self.history = options.history
+        self.cursor = options.cursor
+        self.by_timestamp = by_timestamp
+
+    def lines(self) -> Iterator[str]:
+        started = time.perf_counter()
+        resume, position = decode_cursor(self.cursor, self.source)
+        enrich = HistoryEnricher(self.history) if self.history > 0 else None
+        runners = {name: _RUNNERS[name](self) for name in self.models}
+        detector = runners["anomaly"].detector if "anomaly" in runners else None
+
+        points = self._remaining(iter(self.points), resume, position, enrich, detector)
+        # Read one point before announcing the stream so an unreadable source fails the request.
+        head = next(points, None)
+        if head is not None:
+            points = chain([head], points)
+
+        start: Dict[str, Any] = {
+            "type": "start",
+            "models": self.models,
+            "chunkSize": self.chunk_size,
+            "offset": resume,
+            "severityLevels": SEVERITY_LEVELS,
+        }
+        if "maintenance" in runners:
+            start["actions"] = ACTIONS
+        yield _line(start)
+
+        offset = resume
+        chunks = 0
+        try:
+            for chunk in batches(points, self.chunk_size):
+                if enrich:
+                    chunk = [enrich(point) for point in chunk]
+                line: Dict[str, Any] = {"type": "chunk", "offset": offset, "points": len(chunk)}
+                for name, run in runners.items():
+                    line[name] = run(chunk)
+                offset += len(chunk)
+                chunks += 1
+                if self.by_timestamp:
+                    position = _position_after(chunk, position)
+                line["cursor"] = encode_cursor(self.source, offset, position)
+                yield _line(line)
+        except Exception as exc:  # the status line is already sent; report in-band
+            yield _line(
+                {
+                    "type": "error",
+                    "detail": str(exc),
+                    "offset": offset,
+                    "cursor": encode_cursor(self.source, offset, position),
+                }
+            )
+            return
+
+        yield _line(
+            {
+                "type": "end",
+                "points": offset - resume,
+                "chunks": chunks,
+                "offset": offset,
+                "cursor": encode_cursor(self.source, offset, position),
+                "seconds": round(time.perf_counter() - started, 3),
+            }
+        )
+
+    def _remaining(
+        self,
+        points: Iterator[ComponentTelemetry],
+        resume: int,
+        position: Optional[Position],
+        enrich: Optional[HistoryEnricher],
+        detector: Optional[AnomalyDetector],
+    ) -> Iterator[ComponentTelemetry]:
+        """Yields the points the cursor has not covered yet.
+
+        Covered points still feed the rolling history and streaming state, so a
+        resumed backfill scores exactly like an uninterrupted one. They are
+        replayed a chunk at a time, yielding to higher-priority work in between.
+        """
+        component, last = position if position is not None else (None, 0.0)
+        reached = component is None
+        skipped: List[ComponentTelemetry] = []
+        for index, point in enumerate(preemptible(points, self.chunk_size)):
+            if not self.by_timestamp:
+                covered = index < resume
+            elif point.name == component:
+                reached = True
+                # A point without a timestamp cannot be placed against the cursor and is scored.
+                timestamp = point_timestamp(point)
+                covered = timestamp is not None and timestamp <= last
+            else:
+                # Components before the cursor's one in the grouped source are done.
+                covered = not reached
+            if covered:
+                skipped.append(point)
+                if len(skipped) >= self.chunk_size:
+                    _replay(skipped, enrich, detector)
+                    skipped = []
+                continue
+            if skipped:
+                _replay(skipped, enrich, detector)
+                skipped = []
+            yield point
+        _replay(skipped, enrich, detector)
+        if not reached:
+            # Nothing was yielded, so this surfaces before the stream starts.
+            raise ValueError(
+                f"Cursor component '{component}' is no longer in this range; "
+                "restart the backfill without a cursor"
+            )
+
+
+def _replay(
+    points: List[ComponentTelemetry], enrich: Optional[HistoryEnricher], detector: Optional[AnomalyDetector]
+) -> None:
+    if enrich:
+        for point in points:
+            enrich(point)
+    if detector:
+        detector.warm(points)
+
+
+def _position_after(chunk: List[ComponentTelemetry], position: Optional[Position]) -> Optional[Position]:
+    for point in reversed(chunk):
+        timestamp = point_timestamp(point)
+        if timestamp is not None:
+            return point.name, timestamp
+    return position
+
+
+class _AnomalyRunner:
+    def __init__(self, backfill: Backfill) -> None:
+        self.detector = AnomalyDetector()
+        self.min_severity = backfill.min_severity
+
+    def __call__(self, chunk: List[ComponentTelemetry]) -> ChunkResult:
+        # Unfiltered compact results line up with the chunk, so rows map back to timestamps.
+        response = self.detector.detect(AnomalyRequest(components=chunk, compact=True))
+        scores = np.asarray(response.scores, dtype=float)
+        codes = np.asarray(response.severityCodes, dtype=np.int8)
+        selected = select(scores, codes, self.min_severity)
+        return {
+            **_rows(chunk, selected),
+            "scores": scores[selected].tolist(),
+            "severityCodes": codes[selected].tolist(),
+        }
+
+
+class _MaintenanceRunner:
+    def __init__(self, backfill: Backfill) -> None:
+        self.model = PredictiveMaintenanceModel()
+        self.min_severity = backfill.min_severity
+
+    def __call__(self, chunk: List[ComponentTelemetry]) -> ChunkResult:
+        response = self.model.predict(MaintenanceRequest(components=chunk, compact=True))
+        probability = np.asarray(response.probability, dtype=float)
+        codes = np.asarray(response.severityCodes, dtype=np.int8)
+        selected = select(probability, codes, self.min_severity)
+        return {
+            **_rows(chunk, selected),
+            "probability": probability[selected].tolist(),
+            "timeToFailureHours": np.asarray(response.timeToFailureHours)[selected].tolist(),
+            "severityCodes": codes[selected].tolist(),
+            "actionCodes": np.asarray(response.actionCodes, dtype=np.int8)[selected].tolist(),
+        }
+
+
+_RUNNERS: Dict[str, Callable[[Backfill], Callable[[List[ComponentTelemetry]], ChunkResult]]] = {
+    "anomaly": _AnomalyRunner,
+    "maintenance": _MaintenanceRunner,
+}
+
+
+def _rows(chunk: List[ComponentTelemetry], selected: np.ndarray) -> ChunkResult:
+    return {
+        "evaluated": len(chunk),
+        "componentIds": [chunk[index].name for index in selected],
+        "timestamps": [chunk[index].metadata.get("timestamp") for index in selected],
+    }
+
+
+def _line(payload: Dict[str, Any]) -> str:
+    return json.dumps(payload, separators=(",", ":")) + "\n"
+
+
+def encode_cursor(source: str, offset: int, position: Optional[Position] = None) -> str:
+    state: Dict[str, Any] = {"source": source, "offset": offset}
+    if position is not None:
+        state["component"], state["timestamp"] = position
+    payload = json.dumps(state, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], source: str) -> Tuple[int, Optional[Position]]:
+    """Returns the points already scored and, for timestamp cursors, the position reached.
+
+    Raises ``ValueError`` for a corrupt or foreign cursor.
+    """
+    if not cursor:
+        return 0, None
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        offset = int(payload["offset"])
+        found = payload["source"]
+        position = None
+        if "component" in payload:
+            position = (str(payload["component"]), float(payload["timestamp"]))
+    except (ValueError, KeyError, TypeError) as exc:
+        raise ValueError("Malformed backfill cursor") from exc
+    if found != source or offset < 0:
+        raise ValueError("Cursor does not belong to this backfill")
+    return offset, position
+
+
+def range_source(request: BackfillRequest) -> str:
+    """Identifies a time-range backfill so its cursors only resume the same range."""
+    key = json.dumps(
+        [
+            request.since.isoformat(),
+            request.until.isoformat() if request.until else None,
+            sorted(request.componentIds or []),
+        ]
+    )
+    return "range:" + hashlib.blake2b(key.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def backend_points(request: BackfillRequest) -> Iterator[ComponentTelemetry]:
+    """Streams the backend's buffered telemetry for the request's range and components."""
+    until = request.until.timestamp() if request.until else None
+    wanted = set(request.componentIds) if request.componentIds else None
+    # The backend applies ``since``; the rest is filtered here as the dump streams in.
+    with backend_client.stream_telemetry(request.since.isoformat()) as fh:
+        for point in iter_recording(fh, BACKEND_DUMP):
+            if wanted is not None and point.name not in wanted:
+                continue
+            if until is not None:
+                timestamp = point_timestamp(point)
+                if timestamp is not None and timestamp > until:
+                    continue
+            yield point
+
+
+def upload_points(spool: IO[bytes], fmt: Optional[str] = None) -> Iterator[ComponentTelemetry]:
+    """Parses an uploaded recording (JSONL or backend dump, optionally gzipped) and closes ``spool``."""
+    spool.seek(0)
+    gzipped = spool.read(2) == b"\x1f\x8b"
+    spool.seek(0)
+    raw = gzip.GzipFile(fileobj=spool, mode="rb") if gzipped else spool
+    with spool, io.TextIOWrapper(raw, encoding="utf-8") as fh:
+        yield from iter_recording(fh, fmt)
+
@@ -11,6 +11,7 @@ from schemas import (
     OptimizationSuggestion,
 )
 from utils.feature_engineering import clamp
+from utils.scheduling import preemptible
 
 
 class ProcessOptimizer:
@@ -18,7 +19,7 @@ class ProcessOptimizer:
         suggestions: List[OptimizationSuggestion] = []
         horizon = request.horizonMinutes or settings.optimizer_default_horizon_minutes
 
-        for component in request.components:
+        for component in preemptible(request.components, settings.analytics_chunk_size):
             suggestion = self._optimise_component(component, request.objective, horizon)
             if suggestion:
                 suggestions.append(suggestion)
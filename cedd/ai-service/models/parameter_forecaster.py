@@ -1,15 +1,36 @@
 from __future__ import annotations
 
+from dataclasses import dataclass
 from datetime import datetime
-from typing import List, Optional
+from typing import Iterable, List, Optional
+
+import numpy as np
 
 from schemas import (
     ParameterEvaluation,
     ParameterEvaluationRequest,
     ParameterEvaluationResponse,
+    ParameterSweep,
+    ParameterSweepCurve,
+    ParameterSweepRequest,
+    ParameterSweepResponse,
     ParameterWarning,
 )
 
+RISK_LEVELS = ["low", "medium", "high", "critical"]
+# Wear multipliers at which risk steps up to medium, high and critical.
+RISK_THRESHOLDS = np.array([1.2, 1.5, 2.0])
+
+
+@dataclass
+class ParameterForecast:
+    in_range: np.ndarray
+    deviation_ratio: np.ndarray
+    wear_multiplier: np.ndarray
+    risk_codes: np.ndarray
+    throughput_impact: np.ndarray
+    estimated_rul: np.ndarray
+
 
 class ParameterForecaster:
     """Provides heuristic wear/throughput forecasts for parameter deviations."""
@@ -18,11 +39,7 @@ class ParameterForecaster:
         self.minimum_rul_hours = 6.0
 
     def evaluate(self, request: ParameterEvaluationRequest) -> ParameterEvaluationResponse:
-        warnings: List[ParameterWarning] = []
-        for evaluation in request.evaluations:
-            warning = self._evaluate_single(evaluation)
-            if warning:
-                warnings.append(warning)
+        warnings = [warning for warning in self.evaluate_many(request.evaluations) if warning]
 
         return ParameterEvaluationResponse(
             success=True,
@@ -30,29 +47,160 @@ class ParameterForecaster:
             timestamp=datetime.utcnow().isoformat(),
         )
 
-    def _evaluate_single(self, evaluation: ParameterEvaluation) -> Optional[ParameterWarning]:
-        value = evaluation.proposedValue
-        recommended_min = self._fallback(evaluation.recommendedMin, evaluation.minValue)
-        recommended_max = self._fallback(evaluation.recommendedMax, evaluation.maxValue)
+    def evaluate_many(self, evaluations: List[ParameterEvaluation]) -> List[Optional[ParameterWarning]]:
+        """Evaluates each entry, keeping ``None`` for in-range values so results stay aligned."""
+        if not evaluations:
+            return []
+        forecast = self.forecast(
+            np.array([evaluation.proposedValue for evaluation in evaluations], dtype=float),
+            _column(evaluation.defaultValue for evaluation in evaluations),
+            _column(self._fallback(evaluation.recommendedMin, evaluation.minValue) for evaluation in evaluations),
+            _column(self._fallback(evaluation.recommendedMax, evaluation.maxValue) for evaluation in evaluations),
+        )
+        return [
+            None if forecast.in_range[index] else self._warning(evaluation, forecast, index)
+            for index, evaluation in enumerate(evaluations)
+        ]
 
-        if recommended_min is not None and recommended_max is not None:
-            if recommended_min <= value <= recommended_max:
-                return None
+    def evaluate_batch(
+        self, requests: List[ParameterEvaluationRequest]
+    ) -> List[ParameterEvaluationResponse]:
+        """Evaluates several requests in one pass and splits the warnings per request."""
+        results = self.evaluate_many(
+            [evaluation for request in requests for evaluation in request.evaluations]
+        )
+        timestamp = datetime.utcnow().isoformat()
 
-        default_value = evaluation.defaultValue
-        deviation_ratio = self._compute_deviation_ratio(value, default_value)
-        magnitude = abs(deviation_ratio)
+        responses: List[ParameterEvaluationResponse] = []
+        offset = 0
+        for request in requests:
+            count = len(request.evaluations)
+            responses.append(
+                ParameterEvaluationResponse(
+                    success=True,
+                    warnings=[warning for warning in results[offset:offset + count] if warning],
+                    timestamp=timestamp,
+                )
+            )
+            offset += count
+        return responses
+
+    def sweep(self, request: ParameterSweepRequest) -> ParameterSweepResponse:
+        """Forecasts every grid point of every sweep in a single vectorised pass."""
+        sweeps = request.sweeps
+        grids = [self._grid(sweep) for sweep in sweeps]
+        sizes = [len(grid) for grid in grids]
+        ranges = [
+            (
+                self._fallback(sweep.recommendedMin, sweep.minValue),
+                self._fallback(sweep.recommendedMax, sweep.maxValue),
+            )
+            for sweep in sweeps
+        ]
+
+        forecast = self.forecast(
+            np.concatenate(grids),
+            np.repeat(_column(sweep.defaultValue for sweep in sweeps), sizes),
+            np.repeat(_column(low for low, _ in ranges), sizes),
+            np.repeat(_column(high for _, high in ranges), sizes),
+        )
+        overflow = ~(
+            np.isfinite(forecast.wear_multiplier)
+            & np.isfinite(forecast.throughput_impact)
+            & np.isfinite(forecast.estimated_rul)
+        )
+        if overflow.any():
+            point = int(np.argmax(overflow))
+            sweep = sweeps[int(np.searchsorted(np.cumsum(sizes), point, side="right"))]
+            raise ValueError(
+                f"Sweep of {sweep.componentId}.{sweep.parameter} overflows the forecast "
+                f"at value {np.concatenate(grids)[point]:g}"
+            )
+
+        splits = np.cumsum(sizes)[:-1]
+        columns = [
+            np.split(array, splits)
+            for array in (
+                forecast.in_range,
+                forecast.wear_multiplier,
+                forecast.risk_codes,
+                forecast.throughput_impact,
+                forecast.estimated_rul,
+            )
+        ]
+        curves = [
+            ParameterSweepCurve(
+                componentId=sweep.componentId,
+                parameter=sweep.parameter,
+                defaultValue=sweep.defaultValue,
+                recommendedRange={"min": low, "max": high},
+                values=grid.tolist(),
+                inRange=in_range.tolist(),
+                wearMultiplier=wear.tolist(),
+                riskCodes=risk.tolist(),
+                throughputImpact=throughput.tolist(),
+                estimatedRULHours=rul.tolist(),
+            )
+            for sweep, grid, (low, high), in_range, wear, risk, throughput, rul in zip(sweeps, grids, ranges, *columns)
+        ]
+
+        return ParameterSweepResponse(
+            success=True,
+            evaluated=int(sum(sizes)),
+            riskLevels=RISK_LEVELS,
+            curves=curves,
+            timestamp=datetime.utcnow().isoformat(),
+        )
+
+    def forecast(
+        self,
+        values: np.ndarray,
+        default_value: np.ndarray,
+        recommended_min: np.ndarray,
+        recommended_max: np.ndarray,
+    ) -> ParameterForecast:
+        """Forecasts wear for every proposed value at once; unset defaults and bounds are NaN.
+
+        Values inside the recommended range get the nominal wear multiplier of 1.0.
+        """
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            has_default = np.isfinite(default_value) & (default_value != 0)
+            deviation_ratio = np.where(has_default, (values - default_value) / default_value, 0.0)
+            in_range = (recommended_min <= values) & (values <= recommended_max)
+
+            wear_multiplier = 1.0 + np.maximum(np.abs(deviation_ratio) * 1.6, 0.15)
+            wear_multiplier += np.where(
+                (values < recommended_min) & (recommended_min != 0),
+                (recommended_min - values) / np.abs(recommended_min) * 0.5,
+                0.0,
+            )
+            wear_multiplier += np.where(
+                (values > recommended_max) & (recommended_max != 0),
+                (values - recommended_max) / np.abs(recommended_max) * 0.5,
+                0.0,
+            )
+        wear_multiplier = np.where(in_range, 1.0, _round(np.maximum(wear_multiplier, 1.05), 2))
 
-        wear_multiplier = 1.0 + max(magnitude * 1.6, 0.15)
-        wear_multiplier = self._adjust_for_bounds(wear_multiplier, value, recommended_min, recommended_max)
-        wear_multiplier = round(wear_multiplier, 2)
+        return ParameterForecast(
+            in_range=in_range,
+            deviation_ratio=deviation_ratio,
+            wear_multiplier=wear_multiplier,
+            risk_codes=np.searchsorted(RISK_THRESHOLDS, wear_multiplier, side="right"),
+            throughput_impact=_round(deviation_ratio * 100.0, 1),
+            estimated_rul=_round(np.maximum(self.minimum_rul_hours, 72.0 / wear_multiplier), 1),
+        )
 
-        risk = self._classify_risk(wear_multiplier)
-        throughput_impact = deviation_ratio * 100.0
-        estimated_rul = round(max(self.minimum_rul_hours, 72.0 / wear_multiplier), 1)
+    def _warning(
+        self, evaluation: ParameterEvaluation, forecast: ParameterForecast, index: int
+    ) -> ParameterWarning:
+        value = evaluation.proposedValue
+        default_value = evaluation.defaultValue
+        recommended_min = self._fallback(evaluation.recommendedMin, evaluation.minValue)
+        recommended_max = self._fallback(evaluation.recommendedMax, evaluation.maxValue)
+        risk = RISK_LEVELS[forecast.risk_codes[index]]
 
         notes = self._build_notes(
-            deviation_ratio,
+            float(forecast.deviation_ratio[index]),
             default_value,
             recommended_min,
             recommended_max,
@@ -64,9 +212,9 @@ class ParameterForecaster:
             componentId=evaluation.componentId,
             parameter=evaluation.parameter,
             risk=risk,
-            throughputImpact=round(throughput_impact, 1),
-            wearMultiplier=wear_multiplier,
-            estimatedRULHours=estimated_rul,
+            throughputImpact=float(forecast.throughput_impact[index]),
+            wearMultiplier=float(forecast.wear_multiplier[index]),
+            estimatedRULHours=float(forecast.estimated_rul[index]),
             notes=notes,
             suggestions=suggestions,
             value=value,
@@ -76,38 +224,14 @@ class ParameterForecaster:
         )
 
     @staticmethod
-    def _fallback(primary, secondary):
-        return primary if primary is not None else secondary
-
-    @staticmethod
-    def _compute_deviation_ratio(value: float, default_value: Optional[float]) -> float:
-        if default_value in (None, 0):
-            return 0.0
-        return (value - default_value) / default_value
-
-    @staticmethod
-    def _adjust_for_bounds(
-        wear_multiplier: float,
-        value: float,
-        recommended_min: Optional[float],
-        recommended_max: Optional[float],
-    ) -> float:
-        adjusted = wear_multiplier
-        if recommended_min is not None and value < recommended_min and recommended_min != 0:
-            adjusted += (recommended_min - value) / abs(recommended_min) * 0.5
-        if recommended_max is not None and value > recommended_max and recommended_max != 0:
-            adjusted += (value - recommended_max) / abs(recommended_max) * 0.5
-        return max(adjusted, 1.05)
+    def _grid(sweep: ParameterSweep) -> np.ndarray:
+        if sweep.values is not None:
+            return np.asarray(sweep.values, dtype=float)
+        return np.linspace(sweep.start, sweep.stop, sweep.steps)
 
     @staticmethod
-    def _classify_risk(wear_multiplier: float) -> str:
-        if wear_multiplier >= 2.0:
-            return "critical"
-        if wear_multiplier >= 1.5:
-            return "high"
-        if wear_multiplier >= 1.2:
-            return "medium"
-        return "low"
+    def _fallback(primary, secondary):
+        return primary if primary is not None else secondary
 
     @staticmethod
     def _build_notes(
@@ -147,11 +271,16 @@ class ParameterForecaster:
         return suggestions
 
 
+def _column(values: Iterable[Optional[float]]) -> np.ndarray:
+    return np.array([np.nan if value is None else value for value in values], dtype=float)
 
 
-
-
-
-
-
-
+def _round(values: np.ndarray, digits: int) -> np.ndarray:
+    """``np.round`` that agrees with Python's ``round()``, which it can miss by one digit near a tie."""
+    rounded = np.round(values, digits)
+    with np.errstate(invalid="ignore", over="ignore"):
+        scaled = values * 10.0 ** digits
+        ties = np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)
+    for index in ties:
+        rounded[index] = round(float(values[index]), digits)
+    return rounded
@@ -1,38 +1,87 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import List
+from typing import List, Tuple
 
 import numpy as np
 
 from config import settings
 from schemas import (
+    CompactMaintenanceResponse,
     ComponentTelemetry,
     MaintenancePrediction,
     MaintenanceRequest,
     MaintenanceResponse,
 )
 from utils.feature_engineering import rolling_trend
+from utils.response_filters import SEVERITY_LEVELS, select, severity_codes
+from utils.scheduling import preemptible
+from utils.tracing import span
+
+
+ACTIONS = [
+    "Inspect for overheating or over-speed",
+    "Check for stalling or under-performance",
+]
 
 
 class PredictiveMaintenanceModel:
-    def predict(self, request: MaintenanceRequest) -> MaintenanceResponse:
-        predictions: List[MaintenancePrediction] = []
+    def predict(self, request: MaintenanceRequest) -> MaintenanceResponse | CompactMaintenanceResponse:
         lookahead = request.lookaheadHours or settings.maintenance_default_hours
+        with span("maintenance.forecast"):
+            forecasts = np.array(
+                [
+                    self._forecast_component(component, lookahead)
+                    for component in preemptible(request.components, settings.analytics_chunk_size)
+                ]
+            ).reshape(-1, 5)
+        time_to_failure, probability, window, confidence, rate = forecasts.T
+
+        codes = self._severity_codes(probability)
+        selected = select(probability, codes, request.minSeverity, request.topK)
+        action_codes = (rate <= 0).astype(np.int8)
+        timestamp = datetime.utcnow().isoformat()
 
-        for component in request.components:
-            prediction = self._predict_component(component, lookahead)
-            predictions.append(prediction)
+        if request.compact:
+            return CompactMaintenanceResponse(
+                success=True,
+                evaluated=len(request.components),
+                componentIds=[request.components[index].name for index in selected],
+                timeToFailureHours=time_to_failure[selected].tolist(),
+                probability=probability[selected].tolist(),
+                maintenanceWindowHours=window[selected].tolist(),
+                confidence=confidence[selected].tolist(),
+                severityCodes=codes[selected].tolist(),
+                severityLevels=SEVERITY_LEVELS,
+                actionCodes=action_codes[selected].tolist(),
+                actions=ACTIONS,
+                timestamp=timestamp,
+            )
+
+        predictions: List[MaintenancePrediction] = []
+        for index in selected:
+            component = request.components[index]
+            predictions.append(
+                MaintenancePrediction(
+                    componentId=component.name,
+                    timeToFailureHours=float(time_to_failure[index]),
+                    probability=float(probability[index]),
+                    maintenanceWindowHours=float(window[index]),
+                    recommendedAction=self._action(component, float(rate[index])),
+                    confidence=float(confidence[index]),
+                    severity=SEVERITY_LEVELS[codes[index]],
+                )
+            )
 
         return MaintenanceResponse(
             success=True,
             predictions=predictions,
-            timestamp=datetime.utcnow().isoformat(),
+            timestamp=timestamp,
         )
 
-    def _predict_component(
+    def _forecast_component(
         self, component: ComponentTelemetry, lookahead: int
-    ) -> MaintenancePrediction:
+    ) -> Tuple[float, float, float, float, float]:
         trend = rolling_trend(component)
         degradation_rate = abs(trend.rate)
 
@@ -44,18 +93,20 @@ class PredictiveMaintenanceModel:
         probability = float(min(0.95, degradation_rate * 2))
         maintenance_window = max(4.0, time_to_failure * 0.2)
 
-        if trend.rate > 0:
-            action = f"Inspect {component.name} for overheating or over-speed."
-        else:
-            action = f"Check {component.name} for stalling or under-performance."
-
-        return MaintenancePrediction(
-            componentId=component.name,
-            timeToFailureHours=round(time_to_failure, 2),
-            probability=round(probability, 2),
-            maintenanceWindowHours=round(maintenance_window, 2),
-            recommendedAction=action,
-            confidence=round(1 - np.exp(-degradation_rate + 1e-3), 2),
+        return (
+            round(time_to_failure, 2),
+            round(probability, 2),
+            round(maintenance_window, 2),
+            round(1 - np.exp(-degradation_rate + 1e-3), 2),
+            trend.rate,
         )
 
+    @staticmethod
+    def _severity_codes(probability: np.ndarray) -> np.ndarray:
+        return severity_codes(probability, 0.2, 0.5, 0.8)
 
+    @staticmethod
+    def _action(component: ComponentTelemetry, rate: float) -> str:
+        if rate > 0:
+            return f"Inspect {component.name} for overheating or over-speed."
+        return f"Check {component.name} for stalling or under-performance."
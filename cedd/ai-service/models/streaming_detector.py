@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from config import settings
+
+# Scales the mean absolute deviation to a standard-deviation estimate for normal data.
+MAD_TO_SIGMA = 1.2533
+
+
+class _ComponentState:
+    __slots__ = ("mean", "mad", "count")
+
+    def __init__(self, value: float) -> None:
+        self.mean = value
+        self.mad = 0.0
+        self.count = 1
+
+
+class StreamingAnomalyEngine:
+    """Robust EWMA/MAD control limits updated in O(1) time and memory per component.
+
+    Each point is scored against the component's running mean and absolute
+    deviation before being folded in. Deviations are clipped at ``clip`` sigma
+    when updating so a single spike cannot drag the limits with it.
+
+    State is shared between the batcher thread, scheduler workers and the state
+    export/import endpoints, so every access holds a lock.
+    """
+
+    def __init__(
+        self,
+        alpha: Optional[float] = None,
+        warmup: Optional[int] = None,
+        clip: Optional[float] = None,
+        z_scale: Optional[float] = None,
+    ) -> None:
+        self.alpha = alpha if alpha is not None else settings.streaming_alpha
+        self.warmup = warmup if warmup is not None else settings.streaming_warmup
+        self.clip = clip if clip is not None else settings.streaming_clip
+        self.z_scale = z_scale if z_scale is not None else settings.streaming_z_scale
+        self._states: Dict[str, _ComponentState] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._states)
+
+    def update(self, key: str, value: float) -> Tuple[float, float]:
+        """Scores ``value`` for ``key`` and updates its state. Returns ``(z_score, score)``."""
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                self._states[key] = _ComponentState(value)
+                return 0.0, 0.0
+
+            deviation = value - state.mean
+            sigma = MAD_TO_SIGMA * state.mad
+            warm = state.count >= self.warmup and sigma > 0.0
+            z_score = deviation / sigma if warm else 0.0
+
+            if warm:
+                limit = self.clip * sigma
+                deviation = max(-limit, min(deviation, limit))
+            # Plain running averages until 1/n drops below alpha avoid start-up bias.
+            rate = max(self.alpha, 1.0 / (state.count + 1))
+            state.mean += rate * deviation
+            state.mad += rate * (abs(deviation) - state.mad)
+            state.count += 1
+
+        return z_score, abs(z_score) / self.z_scale
+
+    def keys(self) -> List[str]:
+        with self._lock:
+            return list(self._states)
+
+    def export_state(self, keys: Iterable[str], remove: bool = False) -> Dict[str, Tuple[float, float, int]]:
+        """Returns ``(mean, mad, count)`` per key so state can follow a component to another shard."""
+        exported: Dict[str, Tuple[float, float, int]] = {}
+        with self._lock:
+            for key in keys:
+                state = self._states.pop(key, None) if remove else self._states.get(key)
+                if state is not None:
+                    exported[key] = (state.mean, state.mad, state.count)
+        return exported
+
+    def import_state(self, states: Dict[str, Tuple[float, float, int]]) -> int:
+        with self._lock:
+            for key, (mean, mad, count) in states.items():
+                state = _ComponentState(mean)
+                state.mad = mad
+                state.count = count
+                self._states[key] = state
+        return len(states)
+
+    def reset(self, key: Optional[str] = None) -> None:
+        with self._lock:
+            if key is None:
+                self._states.clear()
+            else:
+                self._states.pop(key, None)
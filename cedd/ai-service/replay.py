@@ -0,0 +1,227 @@
+"""Replay recorded telemetry through the ai-service models and report how they cope.
+
+Examples (run from ``cedd/ai-service``)::
+
+    python replay.py recording.jsonl
+    python replay.py telemetry-dump.json --models anomaly --threshold 0.5 --json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import time
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional
+
+from config import settings
+from schemas import AnomalyRequest, ComponentTelemetry, MaintenanceRequest, OptimizationRequest
+from utils.recordings import (
+    FORMATS,
+    HistoryEnricher,
+    batches,
+    iter_recording,
+    open_recording,
+    point_timestamp,
+)
+
+try:  # not available on Windows
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None
+
+
+class LatencyReservoir:
+    """Fixed-size uniform sample of latencies so percentiles stay bounded in memory."""
+
+    def __init__(self, size: int = 10000, seed: int = 0) -> None:
+        self.size = size
+        self.samples: List[float] = []
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+        self._random = random.Random(seed)
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.maximum = max(self.maximum, value)
+        if len(self.samples) < self.size:
+            self.samples.append(value)
+            return
+        slot = self._random.randrange(self.count)
+        if slot < self.size:
+            self.samples[slot] = value
+
+    def summary(self) -> Dict[str, float]:
+        ordered = sorted(self.samples)
+
+        def pick(q: float) -> float:
+            return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+        return {
+            "calls": self.count,
+            "meanMs": round(self.total / self.count, 3) if self.count else 0.0,
+            "p50Ms": round(pick(0.50), 3),
+            "p95Ms": round(pick(0.95), 3),
+            "p99Ms": round(pick(0.99), 3),
+            "maxMs": round(self.maximum, 3),
+        }
+
+
+def _anomaly_runner() -> Callable[[List[ComponentTelemetry]], Counter]:
+    from models.anomaly_detector import AnomalyDetector
+
+    detector = AnomalyDetector()
+
+    def run(components: List[ComponentTelemetry]) -> Counter:
+        response = detector.detect(AnomalyRequest(components=components, compact=True))
+        return Counter(response.severityLevels[code] for code in response.severityCodes)
+
+    return run
+
+
+def _maintenance_runner() -> Callable[[List[ComponentTelemetry]], Counter]:
+    from models.predictive_maintenance import PredictiveMaintenanceModel
+
+    model = PredictiveMaintenanceModel()
+
+    def run(components: List[ComponentTelemetry]) -> Counter:
+        response = model.predict(MaintenanceRequest(components=components, compact=True))
+        return Counter(response.severityLevels[code] for code in response.severityCodes)
+
+    return run
+
+
+def _optimizer_runner() -> Callable[[List[ComponentTelemetry]], Counter]:
+    from models.optimizer import ProcessOptimizer
+
+    optimizer = ProcessOptimizer()
+
+    def run(components: List[ComponentTelemetry]) -> Counter:
+        response = optimizer.optimise(OptimizationRequest(components=components))
+        return Counter(suggestions=len(response.suggestions))
+
+    return run
+
+
+RUNNERS: Dict[str, Callable[[], Callable[[List[ComponentTelemetry]], Counter]]] = {
+    "anomaly": _anomaly_runner,
+    "maintenance": _maintenance_runner,
+    "optimize": _optimizer_runner,
+}
+
+
+def _peak_memory_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+
+
+def replay(
+    points: Iterable[ComponentTelemetry],
+    models: List[str],
+    batch_size: int = 256,
+    history: int = 20,
+) -> Dict:
+    runners = {name: RUNNERS[name]() for name in models}
+    latencies = {name: LatencyReservoir() for name in models}
+    alerts = {name: Counter() for name in models}
+    enrich = HistoryEnricher(history) if history > 0 else None
+
+    total = 0
+    first_ts: Optional[float] = None
+    last_ts: Optional[float] = None
+    started = time.perf_counter()
+
+    for batch in batches(points, batch_size):
+        if enrich:
+            batch = [enrich(component) for component in batch]
+        for component in (batch[0], batch[-1]):
+            ts = point_timestamp(component)
+            if ts is not None:
+                first_ts = ts if first_ts is None else min(first_ts, ts)
+                last_ts = ts if last_ts is None else max(last_ts, ts)
+
+        for name, run in runners.items():
+            call_started = time.perf_counter()
+            alerts[name].update(run(batch))
+            latencies[name].add((time.perf_counter() - call_started) * 1000.0)
+        total += len(batch)
+
+    elapsed = time.perf_counter() - started
+    recorded_span = (last_ts - first_ts) if first_ts is not None and last_ts is not None else None
+    return {
+        "points": total,
+        "seconds": round(elapsed, 3),
+        "pointsPerSecond": round(total / elapsed, 1) if elapsed else None,
+        "recordedSeconds": round(recorded_span, 3) if recorded_span is not None else None,
+        "realtimeFactor": round(recorded_span / elapsed, 1) if recorded_span and elapsed else None,
+        "batchSize": batch_size,
+        "anomalyThreshold": settings.anomaly_default_threshold,
+        "latency": {name: reservoir.summary() for name, reservoir in latencies.items()},
+        "alerts": {name: dict(counter) for name, counter in alerts.items()},
+        "peakMemoryMb": _peak_memory_mb(),
+    }
+
+
+def _print_report(report: Dict) -> None:
+    print(f"points          {report['points']}")
+    print(f"wall time       {report['seconds']} s  ({report['pointsPerSecond']} points/s)")
+    if report["realtimeFactor"]:
+        print(f"recorded span   {report['recordedSeconds']} s  ({report['realtimeFactor']}x real time)")
+    print(f"threshold       {report['anomalyThreshold']}")
+    for name, summary in report["latency"].items():
+        print(
+            f"{name:<15} calls={summary['calls']} mean={summary['meanMs']}ms p50={summary['p50Ms']}ms "
+            f"p95={summary['p95Ms']}ms p99={summary['p99Ms']}ms max={summary['maxMs']}ms"
+        )
+        counts = report["alerts"][name]
+        if counts:
+            print(f"{'':<15} " + " ".join(f"{key}={value}" for key, value in sorted(counts.items())))
+    if report["peakMemoryMb"] is not None:
+        print(f"peak memory     {report['peakMemoryMb']} MB")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("recording", help="JSONL file, backend /api/telemetry dump, .gz of either, or '-' for stdin")
+    parser.add_argument("--format", choices=FORMATS, help="recording format (auto-detected by default)")
+    parser.add_argument(
+        "--models",
+        default=",".join(RUNNERS),
+        help=f"comma-separated subset of: {', '.join(RUNNERS)} (default: all)",
+    )
+    parser.add_argument("--batch-size", type=int, default=256, help="points scored per model call")
+    parser.add_argument("--history", type=int, default=20, help="rolling window for derived history (0 disables)")
+    parser.add_argument("--threshold", type=float, help="override ANOMALY_THRESHOLD for this run")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    models = [name.strip() for name in args.models.split(",") if name.strip()]
+    unknown = [name for name in models if name not in RUNNERS]
+    if unknown or not models:
+        parser.error(f"unknown model(s): {', '.join(unknown) or '(none given)'}")
+    if args.threshold is not None:
+        settings.anomaly_default_threshold = args.threshold
+
+    with open_recording(args.recording) as fh:
+        report = replay(
+            iter_recording(fh, args.format),
+            models,
+            batch_size=max(args.batch_size, 1),
+            history=args.history,
+        )
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        _print_report(report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,404 @@
+"""Shard router: fans ai-service requests out by consistent hashing and merges the results.
+
+Run against already running shards::
+
+    SHARD_URLS=http://localhost:5001,http://localhost:5002 uvicorn router:app --port 5000
+
+or let the router spawn local shard processes (one per port after ``--port``)::
+
+    python router.py --local 3 --port 5000
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import httpx
+from fastapi import Body, FastAPI, HTTPException
+from fastapi.middleware.cors import CORSMiddleware
+
+from config import settings
+from schemas import ShardChangeRequest
+from utils.data_client import backend_client
+from utils.sharding import HashRing
+
+# Response lists that describe codes rather than one entry per component.
+LOOKUP_FIELDS = {"severityLevels", "actions", "riskLevels"}
+
+
+@dataclass(frozen=True)
+class Route:
+    items: str
+    results: str
+    item_key: str
+    score: Optional[str] = None
+    compact_score: Optional[str] = None
+    raw_score: Optional[str] = None
+    fetch_telemetry: bool = False
+
+
+ROUTES: Dict[str, Route] = {
+    "/ai/anomaly/detect": Route(
+        "components", "anomalies", "name", "score", "scores", raw_score="rawScores", fetch_telemetry=True
+    ),
+    "/ai/maintenance/predict": Route(
+        "components", "predictions", "name", "probability", "probability", fetch_telemetry=True
+    ),
+    "/ai/optimize": Route("components", "suggestions", "name", fetch_telemetry=True),
+    "/ai/offline/evaluate": Route("components", "alerts", "componentId"),
+    "/ai/parameter/evaluate": Route("evaluations", "warnings", "componentId"),
+    "/ai/parameter/sweep": Route("sweeps", "curves", "componentId"),
+}
+
+
+class ShardRouter:
+    def __init__(self, urls: List[str], key: str = "component", replicas: int = 128) -> None:
+        self.ring = HashRing(urls, replicas=replicas)
+        self.key = key
+        # componentId -> line/plant, learned from traffic so state can be migrated by the same key.
+        self._routing_keys: Dict[str, str] = {}
+        self._client: Optional[httpx.AsyncClient] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=settings.shard_timeout_seconds)
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def routing_key(self, item: Dict[str, Any], id_field: str) -> str:
+        component_id = str(item.get(id_field, ""))
+        if self.key == "component":
+            return component_id
+        value = (item.get("metadata") or {}).get(self.key)
+        if value is None:
+            return self._routing_keys.get(component_id, component_id)
+        self._routing_keys[component_id] = str(value)
+        return str(value)
+
+    def owner(self, component_id: str) -> Optional[str]:
+        return self.ring.node_for(self._routing_keys.get(component_id, component_id))
+
+    async def forward(self, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        route = ROUTES[path]
+        items = payload.get(route.items) or []
+        if not items and route.fetch_telemetry:
+            components = await asyncio.to_thread(backend_client.fetch_recent_components)
+            items = [component.model_dump(by_alias=True) for component in components]
+        if not items:
+            raise HTTPException(status_code=400, detail=f"No {route.items} provided to route")
+        if not len(self.ring):
+            raise HTTPException(status_code=503, detail="No shards configured")
+
+        groups = self.ring.partition(self.routing_key(item, route.item_key) for item in items)
+        forwarded = dict(payload)
+        if payload.get("topK") and route.raw_score:
+            # Shards return rounded scores; rank the merged topK on the exact ones.
+            forwarded[route.raw_score] = True
+        responses = await asyncio.gather(
+            *(
+                self._post(node, path, {**forwarded, route.items: [items[position] for position in positions]})
+                for node, positions in groups.items()
+            )
+        )
+        return merge_responses(route, payload, items, responses)
+
+    async def add_shard(self, url: str) -> Dict[str, Any]:
+        async with self._lock:
+            if url in self.ring.nodes:
+                return {"added": False, "moved": 0}
+            health = await self._get(url, "/health")
+            if health.get("status") != "healthy":
+                raise HTTPException(status_code=503, detail={"shard": url, "error": "Shard is not healthy"})
+            previous = list(self.ring.nodes)
+            self.ring.add(url)
+            try:
+                moves: Dict[str, List[str]] = {}
+                for node in previous:
+                    tracked = (await self._get(node, "/ai/streaming/state"))["componentIds"]
+                    moves[node] = [cid for cid in tracked if self.owner(cid) == url]
+                moved = await self._copy_state(moves)
+            except Exception:
+                self.ring.remove(url)
+                raise
+            return {"added": True, "moved": moved, "stale": await self._drop_state(moves)}
+
+    async def remove_shard(self, url: str) -> Dict[str, Any]:
+        async with self._lock:
+            if url not in self.ring.nodes:
+                return {"removed": False, "moved": 0}
+            self.ring.remove(url)
+            moves: Dict[str, List[str]] = {}
+            try:
+                if len(self.ring):
+                    moves[url] = (await self._get(url, "/ai/streaming/state"))["componentIds"]
+                moved = await self._copy_state(moves)
+            except Exception:
+                self.ring.add(url)
+                raise
+            return {"removed": True, "moved": moved, "stale": await self._drop_state(moves)}
+
+    async def _copy_state(self, moves: Dict[str, List[str]]) -> int:
+        """Copies streaming detector state from each source to the components' new owners.
+
+        Sources keep their copy, so a failure part-way leaves nothing lost and the
+        caller can roll the ring back. ``_drop_state`` removes it once every copy is in.
+        """
+        copied = 0
+        for source, component_ids in moves.items():
+            if not component_ids:
+                continue
+            exported = await self._post(source, "/ai/streaming/state/export", {"componentIds": component_ids})
+            by_owner: Dict[str, Dict[str, Any]] = {}
+            for component_id, state in exported["states"].items():
+                by_owner.setdefault(self.owner(component_id), {})[component_id] = state
+            for owner, states in by_owner.items():
+                await self._post(owner, "/ai/streaming/state/import", {"states": states})
+            copied += len(exported["states"])
+        return copied
+
+    async def _drop_state(self, moves: Dict[str, List[str]]) -> List[str]:
+        """Deletes migrated state from its sources; returns the sources that could not be cleaned."""
+        stale: List[str] = []
+        for source, component_ids in moves.items():
+            if not component_ids:
+                continue
+            try:
+                await self._post(
+                    source, "/ai/streaming/state/export", {"componentIds": component_ids, "remove": True}
+                )
+            except HTTPException:
+                # The new owners already hold the state; a leftover copy is only overwritten later.
+                stale.append(source)
+        return stale
+
+    async def _post(self, node: str, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        return await self._request("POST", node, path, json=payload)
+
+    async def _get(self, node: str, path: str) -> Dict[str, Any]:
+        return await self._request("GET", node, path)
+
+    async def _request(self, method: str, node: str, path: str, **kwargs) -> Dict[str, Any]:
+        try:
+            resp = await self.client.request(method, f"{node.rstrip('/')}{path}", **kwargs)
+        except httpx.HTTPError as exc:
+            raise HTTPException(status_code=502, detail=f"Shard {node} unreachable: {exc}") from exc
+        if resp.status_code >= 400:
+            try:
+                detail = resp.json().get("detail", resp.text)
+            except ValueError:
+                detail = resp.text
+            raise HTTPException(status_code=resp.status_code, detail={"shard": node, "error": detail})
+        return resp.json()
+
+
+def merge_responses(
+    route: Route,
+    payload: Dict[str, Any],
+    items: List[Dict[str, Any]],
+    responses: List[Dict[str, Any]],
+) -> Dict[str, Any]:
+    """Combines per-shard responses into the single-service shape.
+
+    Results come back in request order, or by descending score (truncated to
+    ``topK``) when ``topK`` was requested, matching what one instance returns.
+    """
+    order: Dict[str, int] = {}
+    for position, item in enumerate(items):
+        order.setdefault(str(item.get(route.item_key)), position)
+    top_k = payload.get("topK")
+    ranked = bool(top_k) and route.score is not None
+    merged: Dict[str, Any] = {
+        "success": all(response.get("success", False) for response in responses),
+        "timestamp": max(response["timestamp"] for response in responses),
+    }
+    merged.update({field: responses[0][field] for field in responses[0] if field in LOOKUP_FIELDS})
+    if "evaluated" in responses[0]:
+        merged["evaluated"] = sum(response.get("evaluated", 0) for response in responses)
+
+    if payload.get("compact") and responses and "componentIds" in responses[0]:
+        columns = [
+            field
+            for field, value in responses[0].items()
+            if isinstance(value, list) and field not in LOOKUP_FIELDS
+        ]
+        rows = {field: [value for response in responses for value in response[field]] for field in columns}
+        if ranked:
+            scores = rows.get(route.raw_score) or rows[route.compact_score]
+            ids = rows["componentIds"]
+            positions = sorted(
+                range(len(scores)), key=lambda index: (-scores[index], order.get(ids[index], len(order)))
+            )[:top_k]
+        else:
+            ids = rows["componentIds"]
+            positions = sorted(range(len(ids)), key=lambda index: order.get(ids[index], len(order)))
+        merged.update({field: [values[index] for index in positions] for field, values in rows.items()})
+        merged["compact"] = True
+        if route.raw_score and not payload.get(route.raw_score):
+            merged.pop(route.raw_score, None)
+        return merged
+
+    results: List[Dict[str, Any]] = []
+    raw: List[float] = []
+    for response in responses:
+        part = response.get(route.results, [])
+        results.extend(part)
+        if route.raw_score and response.get(route.raw_score) is not None:
+            raw.extend(response[route.raw_score])
+    has_raw = bool(results) and len(raw) == len(results)
+
+    def position(index: int) -> int:
+        return order.get(results[index].get("componentId"), len(order))
+
+    if ranked:
+        scores = raw if has_raw else [result[route.score] for result in results]
+        positions = sorted(range(len(results)), key=lambda index: (-scores[index], position(index)))[:top_k]
+    else:
+        positions = sorted(range(len(results)), key=position)
+    merged[route.results] = [results[index] for index in positions]
+    if has_raw and payload.get(route.raw_score):
+        merged[route.raw_score] = [raw[index] for index in positions]
+    return merged
+
+
+shard_router = ShardRouter(
+    [url.strip() for url in settings.shard_urls.split(",") if url.strip()],
+    key=settings.shard_key,
+    replicas=settings.shard_replicas,
+)
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    yield
+    await shard_router.close()
+
+
+app = FastAPI(
+    title=f"{settings.app_name} Router",
+    version=settings.api_version,
+    lifespan=lifespan,
+    docs_url="/docs",
+    redoc_url="/redoc",
+)
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+
+@app.get("/health")
+async def health() -> Dict[str, object]:
+    async def probe(node: str) -> Dict[str, object]:
+        try:
+            return {"url": node, **(await shard_router._get(node, "/health"))}
+        except HTTPException as exc:
+            return {"url": node, "status": "unreachable", "detail": exc.detail}
+
+    shards = await asyncio.gather(*(probe(node) for node in shard_router.ring.nodes))
+    healthy = bool(shards) and all(shard.get("status") == "healthy" for shard in shards)
+    return {
+        "status": "healthy" if healthy else "degraded",
+        "timestamp": datetime.utcnow().isoformat(),
+        "shards": shards,
+    }
+
+
+@app.get("/router/shards")
+def list_shards() -> Dict:
+    return {
+        "success": True,
+        "shards": shard_router.ring.nodes,
+        "key": shard_router.key,
+        "replicas": shard_router.ring.replicas,
+    }
+
+
+@app.post("/router/shards")
+async def add_shard(request: ShardChangeRequest) -> Dict:
+    result = await shard_router.add_shard(request.url)
+    return {"success": True, **result, "shards": shard_router.ring.nodes}
+
+
+@app.delete("/router/shards")
+async def remove_shard(request: ShardChangeRequest) -> Dict:
+    result = await shard_router.remove_shard(request.url)
+    return {"success": True, **result, "shards": shard_router.ring.nodes}
+
+
+def _register(path: str) -> None:
+    async def forward(payload: Dict[str, Any] = Body(...)) -> Dict:
+        return await shard_router.forward(path, payload)
+
+    app.post(path, name=f"route{path.replace('/', '_')}")(forward)
+
+
+for _path in ROUTES:
+    _register(_path)
+
+
+def _wait_until_healthy(node: str, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{node}/health", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f"Shard {node} did not become healthy within {timeout:.0f}s")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--local", type=int, default=0, help="spawn N local shards on the ports after --port")
+    args = parser.parse_args(argv)
+
+    processes: List[subprocess.Popen] = []
+    # uvicorn re-raises SIGTERM after shutting down; exit normally so the shards are cleaned up.
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        for index in range(args.local):
+            port = args.port + index + 1
+            processes.append(
+                subprocess.Popen(
+                    [sys.executable, "-m", "uvicorn", "app:app", "--host", args.host, "--port", str(port)],
+                    cwd=os.path.dirname(os.path.abspath(__file__)),
+                )
+            )
+            shard_router.ring.add(f"http://{args.host}:{port}")
+        for node in shard_router.ring.nodes:
+            _wait_until_healthy(node)
+        uvicorn.run(app, host=args.host, port=args.port)
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
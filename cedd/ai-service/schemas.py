@@ -1,7 +1,8 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional
-from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import Any, Dict, List, Literal, Optional
+from pydantic import BaseModel, ConfigDict, Field, model_serializer, model_validator
 
 
 class ComponentTelemetry(BaseModel):
@@ -17,8 +18,24 @@ class TelemetryEnvelope(BaseModel):
     timestamp: Optional[str] = None
 
 
-class AnomalyRequest(BaseModel):
+Severity = Literal["low", "medium", "high", "critical"]
+
+# Upper bound on the grid of one parameter sweep.
+MAX_SWEEP_POINTS = 10000
+# Upper bound on the points scored per backfill chunk.
+MAX_BACKFILL_CHUNK = 5000
+
+
+class ResponseOptions(BaseModel):
+    minSeverity: Optional[Severity] = None
+    topK: Optional[int] = Field(default=None, ge=1)
+    compact: bool = False
+
+
+class AnomalyRequest(ResponseOptions):
     components: List[ComponentTelemetry]
+    # Adds unrounded scores so the shard router can rank merged topK results exactly.
+    rawScores: bool = False
 
 
 class AnomalyResult(BaseModel):
@@ -29,13 +46,39 @@ class AnomalyResult(BaseModel):
     recommendations: List[str] = Field(default_factory=list)
 
 
-class AnomalyResponse(BaseModel):
+class RawScores(BaseModel):
+    """Optional unrounded scores, aligned with the returned results and omitted unless requested."""
+
+    rawScores: Optional[List[float]] = None
+
+    @model_serializer(mode="wrap")
+    def _omit_unrequested(self, handler):
+        data = handler(self)
+        if self.rawScores is None:
+            data.pop("rawScores", None)
+        return data
+
+
+class AnomalyResponse(RawScores):
     success: bool
     anomalies: List[AnomalyResult]
     timestamp: str
 
 
-class MaintenanceRequest(BaseModel):
+class CompactAnomalyResponse(RawScores):
+    """Column-oriented anomaly results; severities are indices into ``severityLevels``."""
+
+    success: bool
+    compact: bool = True
+    evaluated: int
+    componentIds: List[str]
+    scores: List[float]
+    severityCodes: List[int]
+    severityLevels: List[str]
+    timestamp: str
+
+
+class MaintenanceRequest(ResponseOptions):
     components: List[ComponentTelemetry]
     lookaheadHours: Optional[int] = None
 
@@ -47,6 +90,7 @@ class MaintenancePrediction(BaseModel):
     maintenanceWindowHours: float
     recommendedAction: str
     confidence: float
+    severity: str = "low"
 
 
 class MaintenanceResponse(BaseModel):
@@ -55,6 +99,24 @@ class MaintenanceResponse(BaseModel):
     timestamp: str
 
 
+class CompactMaintenanceResponse(BaseModel):
+    """Column-oriented predictions; ``actionCodes`` index into ``actions``, severities into ``severityLevels``."""
+
+    success: bool
+    compact: bool = True
+    evaluated: int
+    componentIds: List[str]
+    timeToFailureHours: List[float]
+    probability: List[float]
+    maintenanceWindowHours: List[float]
+    confidence: List[float]
+    severityCodes: List[int]
+    severityLevels: List[str]
+    actionCodes: List[int]
+    actions: List[str]
+    timestamp: str
+
+
 class OptimizationRequest(BaseModel):
     components: List[ComponentTelemetry]
     objective: Optional[str] = "throughput"
@@ -161,3 +223,99 @@ class ParameterEvaluationResponse(BaseModel):
     timestamp: str
 
 
+class ParameterSweep(BaseModel):
+    """One parameter to sweep, over explicit ``values`` or ``steps`` points from ``start`` to ``stop``."""
+
+    # Curves are rendered as strict JSON, which has no inf/NaN.
+    model_config = ConfigDict(allow_inf_nan=False)
+
+    componentId: str
+    componentType: Optional[str] = None
+    parameter: str
+    values: Optional[List[float]] = Field(default=None, min_length=1, max_length=MAX_SWEEP_POINTS)
+    start: Optional[float] = None
+    stop: Optional[float] = None
+    steps: int = Field(default=50, ge=2, le=MAX_SWEEP_POINTS)
+    defaultValue: Optional[float] = None
+    minValue: Optional[float] = None
+    maxValue: Optional[float] = None
+    recommendedMin: Optional[float] = None
+    recommendedMax: Optional[float] = None
+
+    @model_validator(mode="after")
+    def _check_grid(self) -> "ParameterSweep":
+        if self.values is None and (self.start is None or self.stop is None):
+            raise ValueError("Provide either values or start and stop")
+        return self
+
+
+class ParameterSweepRequest(BaseModel):
+    sweeps: List[ParameterSweep] = Field(min_length=1)
+
+
+class ParameterSweepCurve(BaseModel):
+    """Column-oriented risk curve; ``riskCodes`` index into the response's ``riskLevels``."""
+
+    componentId: str
+    parameter: str
+    defaultValue: Optional[float] = None
+    recommendedRange: Dict[str, Optional[float]] = Field(default_factory=dict)
+    values: List[float]
+    inRange: List[bool]
+    wearMultiplier: List[float]
+    riskCodes: List[int]
+    throughputImpact: List[float]
+    estimatedRULHours: List[float]
+
+
+class ParameterSweepResponse(BaseModel):
+    success: bool
+    evaluated: int
+    riskLevels: List[str]
+    curves: List[ParameterSweepCurve]
+    timestamp: str
+
+
+class StreamingStateExportRequest(BaseModel):
+    componentIds: Optional[List[str]] = None
+    remove: bool = False
+
+
+class StreamingState(BaseModel):
+    mean: float
+    mad: float
+    count: int
+
+
+class StreamingStateImportRequest(BaseModel):
+    states: Dict[str, StreamingState]
+
+
+class ShardChangeRequest(BaseModel):
+    url: str
+
+
+class ProfileRequest(BaseModel):
+    requests: int = Field(default=50, ge=1)
+    intervalMs: float = Field(default=1.0, gt=0)
+    waitSeconds: float = Field(default=0.0, ge=0)
+    limit: int = Field(default=25, ge=1)
+
+
+BackfillModel = Literal["anomaly", "maintenance"]
+
+
+class BackfillOptions(BaseModel):
+    models: List[BackfillModel] = Field(default_factory=lambda: ["anomaly"], min_length=1)
+    chunkSize: Optional[int] = Field(default=None, ge=1, le=MAX_BACKFILL_CHUNK)
+    minSeverity: Optional[Severity] = None
+    history: int = Field(default=20, ge=0, le=1000)
+    cursor: Optional[str] = None
+
+
+class BackfillRequest(BackfillOptions):
+    """Re-scores the backend's buffered telemetry between ``since`` and ``until``."""
+
+    since: datetime
+    until: Optional[datetime] = None
+    componentIds: Optional[List[str]] = None
@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import asyncio
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, Generic, List, Optional, TypeVar
+
+from utils import tracing
+from utils.scheduling import INTERACTIVE, PriorityScheduler
+
+RequestT = TypeVar("RequestT")
+ResponseT = TypeVar("ResponseT")
+
+
+@dataclass
+class _PendingRequest(Generic[RequestT]):
+    payload: RequestT
+    size: int
+    enqueued_at: float = field(default_factory=time.perf_counter)
+    dispatched_at: float = 0.0
+    finished_at: float = 0.0
+    future: Future = field(default_factory=Future)
+
+
+class MicroBatcher(Generic[RequestT, ResponseT]):
+    """Coalesces concurrent requests into a single batched model call.
+
+    Callers block in ``submit`` (or await ``submit_async``) while a background
+    worker gathers requests for up to ``window_ms`` (or until ``max_batch_size``
+    items are queued), runs ``handler`` once over the whole batch and scatters
+    the results back. A handler may return an exception in place of a result to
+    fail just that request; if it raises instead, each request is re-run alone.
+
+    With a ``scheduler``, requests awaited through ``submit_async`` count as
+    running ``priority`` work there, so its stats include them and analytics
+    checkpoints yield to them while they wait or run.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[List[RequestT]], List[ResponseT]],
+        window_ms: float,
+        max_batch_size: int,
+        size_of: Callable[[RequestT], int] = lambda _: 1,
+        history: int = 1024,
+        scheduler: Optional[PriorityScheduler] = None,
+        priority: int = INTERACTIVE,
+    ) -> None:
+        self.name = name
+        self.handler = handler
+        self.scheduler = scheduler
+        self.priority = priority
+        self.window_s = max(window_ms, 0.0) / 1000.0
+        self.max_batch_size = max(max_batch_size, 1)
+        self.size_of = size_of
+
+        self._queue: "queue.Queue[_PendingRequest[RequestT]]" = queue.Queue()
+        self._worker: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+        self._batches = 0
+        self._requests = 0
+        self._items = 0
+        self._batch_sizes: Deque[int] = deque(maxlen=history)
+        self._queue_delays_ms: Deque[float] = deque(maxlen=history)
+
+    def submit(self, payload: RequestT) -> ResponseT:
+        pending = self._enqueue(payload)
+        result = pending.future.result()
+        self._trace(pending)
+        return result
+
+    async def submit_async(self, payload: RequestT) -> ResponseT:
+        """Like ``submit``, but awaits the batch on the event loop instead of a thread."""
+        pending = self._enqueue(payload, counted=self.scheduler is not None)
+        try:
+            result = await asyncio.wrap_future(pending.future)
+        finally:
+            if self.scheduler is not None:
+                started = pending.dispatched_at or time.perf_counter()
+                self.scheduler.leave(self.priority, pending.enqueued_at, started)
+        self._trace(pending)
+        return result
+
+    def _enqueue(self, payload: RequestT, counted: bool = False) -> _PendingRequest[RequestT]:
+        self._ensure_worker()
+        pending = _PendingRequest(payload=payload, size=max(self.size_of(payload), 1))
+        if counted:
+            # Counted before it is queued, so a checkpoint cannot miss it.
+            self.scheduler.enter(self.priority)
+        self._queue.put(pending)
+        return pending
+
+    @staticmethod
+    def _trace(pending: _PendingRequest[RequestT]) -> None:
+        # The model runs on the worker thread; credit its time to the caller's trace.
+        tracing.add("batch.queue", pending.dispatched_at - pending.enqueued_at)
+        tracing.add("batch.model", pending.finished_at - pending.dispatched_at)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            sizes = list(self._batch_sizes)
+            delays = sorted(self._queue_delays_ms)
+            return {
+                "name": self.name,
+                "windowMs": round(self.window_s * 1000.0, 3),
+                "maxBatchSize": self.max_batch_size,
+                "batches": self._batches,
+                "requests": self._requests,
+                "items": self._items,
+                "queued": self._queue.qsize(),
+                "batchSize": {
+                    "mean": round(sum(sizes) / len(sizes), 2) if sizes else 0.0,
+                    "max": max(sizes) if sizes else 0,
+                },
+                "queueDelayMs": {
+                    "mean": round(sum(delays) / len(delays), 3) if delays else 0.0,
+                    "p95": round(_percentile(delays, 0.95), 3),
+                    "max": round(delays[-1], 3) if delays else 0.0,
+                },
+            }
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None:
+            return
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run, name=f"batcher-{self.name}", daemon=True
+                )
+                self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            self._dispatch(batch)
+
+    def _collect(self) -> List[_PendingRequest[RequestT]]:
+        first = self._queue.get()
+        batch = [first]
+        items = first.size
+        deadline = first.enqueued_at + self.window_s
+
+        while items < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                pending = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(pending)
+            items += pending.size
+        return batch
+
+    def _dispatch(self, batch: List[_PendingRequest[RequestT]]) -> None:
+        started = time.perf_counter()
+        with self._lock:
+            self._batches += 1
+            self._requests += len(batch)
+            size = sum(pending.size for pending in batch)
+            self._items += size
+            self._batch_sizes.append(size)
+            for pending in batch:
+                pending.dispatched_at = started
+                self._queue_delays_ms.append((started - pending.enqueued_at) * 1000.0)
+
+        try:
+            results = self.handler([pending.payload for pending in batch])
+        except Exception:
+            # One bad payload must not fail its neighbours; re-run each request on its own.
+            for pending in batch:
+                self._dispatch_single(pending)
+            return
+
+        finished = time.perf_counter()
+        for pending, result in zip(batch, results):
+            pending.finished_at = finished
+            _settle(pending.future, result)
+
+    def _dispatch_single(self, pending: _PendingRequest[RequestT]) -> None:
+        try:
+            (result,) = self.handler([pending.payload])
+        except Exception as exc:
+            pending.finished_at = time.perf_counter()
+            pending.future.set_exception(exc)
+            return
+        pending.finished_at = time.perf_counter()
+        _settle(pending.future, result)
+
+
+def _settle(future: Future, result: object) -> None:
+    if isinstance(result, Exception):
+        future.set_exception(result)
+    else:
+        future.set_result(result)
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))
+    return ordered[index]
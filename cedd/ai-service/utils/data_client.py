@@ -1,6 +1,8 @@
 from __future__ import annotations
 
-from typing import List
+import io
+from contextlib import contextmanager
+from typing import IO, Iterator, List, Optional
 
 import httpx
 
@@ -25,6 +27,38 @@ class BackendDataClient:
         except Exception:
             return []
 
+    @contextmanager
+    def stream_telemetry(self, since: Optional[str] = None) -> Iterator[IO[str]]:
+        """Opens the backend's ``/api/telemetry`` dump as a text stream without buffering the body."""
+        params = {"since": since} if since else {}
+        url = f"{self.base_url}/api/telemetry"
+
+        with httpx.stream("GET", url, params=params, timeout=settings.backfill_timeout_seconds) as resp:
+            resp.raise_for_status()
+            yield io.TextIOWrapper(io.BufferedReader(_ByteStream(resp.iter_bytes())), encoding="utf-8")
+
+
+class _ByteStream(io.RawIOBase):
+    """Read-only file object over an iterator of byte chunks."""
+
+    def __init__(self, chunks: Iterator[bytes]) -> None:
+        self._chunks = chunks
+        self._pending = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._pending:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return 0
+            self._pending = chunk
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
 
 backend_client = BackendDataClient()
 
@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+FunctionKey = Tuple[str, int, str]
+
+# A thread whose innermost frame is in one of these modules is blocked, not working.
+_IDLE_MODULES = {"threading.py", "queue.py", "selectors.py"}
+_PATH_DEPTH = 8
+
+
+class SamplingProfiler:
+    """Samples every thread's stack while armed requests are in flight.
+
+    Sampling covers the threadpool workers that run sync endpoints and the
+    micro-batcher threads, which cProfile (single-thread) would miss. Only stacks
+    that pass through service code and are not parked on a lock count.
+    """
+
+    def __init__(self, root: str) -> None:
+        self.root = os.path.abspath(root)
+        self._own_files = {os.path.abspath(__file__), os.path.join(self.root, "utils", "tracing.py")}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.armed = False
+        self.generation = 0
+        self._reset(0, 1.0)
+
+    def _reset(self, requests: int, interval_ms: float) -> None:
+        self.requested = requests
+        self.remaining = requests
+        self.active = 0
+        self.completed = 0
+        self.interval_s = max(interval_ms, 0.1) / 1000.0
+        self.samples = 0
+        self.self_counts: Counter = Counter()
+        self.total_counts: Counter = Counter()
+        self.paths: Counter = Counter()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def arm(self, requests: int, interval_ms: float = 1.0) -> None:
+        with self._lock:
+            self._reset(requests, interval_ms)
+            self.generation += 1
+            self.armed = requests > 0
+            self.started_at = time.perf_counter()
+            if self.armed and self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+                self._thread.start()
+
+    def request_started(self) -> Optional[int]:
+        """Counts the request towards the current arm; returns its generation, or ``None``."""
+        with self._lock:
+            if not self.armed or self.remaining <= 0:
+                return None
+            self.remaining -= 1
+            self.active += 1
+            return self.generation
+
+    def request_finished(self, generation: int) -> None:
+        with self._lock:
+            # A request from before a re-arm no longer counts towards the new profile.
+            if generation != self.generation:
+                return
+            self.active -= 1
+            self.completed += 1
+            if self.remaining == 0 and self.active == 0:
+                self.armed = False
+                self.finished_at = time.perf_counter()
+
+    @property
+    def complete(self) -> bool:
+        return self.requested > 0 and not self.armed
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        while True:
+            with self._lock:
+                if not self.armed:
+                    self._thread = None
+                    return
+                active = self.active
+            if active:
+                self._sample(me)
+            time.sleep(self.interval_s)
+
+    def _sample(self, me: int) -> None:
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            stack: List[FunctionKey] = []
+            in_service = False
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+                in_service = in_service or self._is_service(code.co_filename)
+                frame = frame.f_back
+            if not in_service or os.path.basename(stack[0][0]) in _IDLE_MODULES:
+                continue
+
+            with self._lock:
+                self.samples += 1
+                self.self_counts[stack[0]] += 1
+                self.total_counts.update(set(stack))
+                self.paths[tuple(reversed(stack[:_PATH_DEPTH]))] += 1
+
+    def _is_service(self, filename: str) -> bool:
+        # A virtualenv created inside the service directory is still library code.
+        return (
+            filename.startswith(self.root)
+            and "site-packages" not in filename
+            and filename not in self._own_files
+        )
+
+    def report(self, limit: int = 25) -> Dict[str, object]:
+        with self._lock:
+            samples = self.samples or 1
+            end = self.finished_at or time.perf_counter()
+            return {
+                "status": "complete" if self.complete else ("running" if self.armed else "idle"),
+                "requested": self.requested,
+                "completed": self.completed,
+                "samples": self.samples,
+                "intervalMs": round(self.interval_s * 1000.0, 3),
+                "elapsedSeconds": round(end - self.started_at, 3) if self.started_at else 0.0,
+                "self": [
+                    {"function": self._label(key), "samples": count, "percent": round(100.0 * count / samples, 1)}
+                    for key, count in self.self_counts.most_common(limit)
+                ],
+                "cumulative": [
+                    {"function": self._label(key), "samples": count, "percent": round(100.0 * count / samples, 1)}
+                    for key, count in self.total_counts.most_common(limit)
+                ],
+                "hotPaths": [
+                    {
+                        "path": " > ".join(self._label(key) for key in path),
+                        "samples": count,
+                        "percent": round(100.0 * count / samples, 1),
+                    }
+                    for path, count in self.paths.most_common(min(limit, 10))
+                ],
+            }
+
+    def _label(self, key: FunctionKey) -> str:
+        filename, line, name = key
+        if filename.startswith(self.root):
+            filename = os.path.relpath(filename, self.root)
+        else:
+            filename = os.path.basename(filename)
+        return f"{filename}:{line}({name})"
@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+import gzip
+import io
+import json
+import re
+import statistics
+from collections import deque
+from datetime import datetime
+from typing import IO, Any, Deque, Dict, Iterable, Iterator, List, Optional
+
+from schemas import ComponentTelemetry
+
+JSONL = "jsonl"
+BACKEND_DUMP = "dump"
+FORMATS = (JSONL, BACKEND_DUMP)
+
+_DUMP_KEYS = {"success", "telemetry", "totalComponents"}
+_FIRST_KEY = re.compile(r'^\s*\{\s*"([^"]+)"')
+
+
+def open_recording(path: str) -> IO[str]:
+    if path == "-":
+        import sys
+
+        return io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8")
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def detect_format(head: str) -> str:
+    """Guesses the recording format from its first few kilobytes."""
+    match = _FIRST_KEY.match(head)
+    if match and match.group(1) in _DUMP_KEYS:
+        return BACKEND_DUMP
+    return JSONL
+
+
+def iter_recording(fh: IO[str], fmt: Optional[str] = None) -> Iterator[ComponentTelemetry]:
+    """Yields telemetry points one at a time without loading the recording into memory.
+
+    ``jsonl`` lines may hold a ``TelemetryEnvelope`` (``{"components": [...]}``)
+    or a single ``ComponentTelemetry``. ``dump`` is the backend's
+    ``/api/telemetry`` response (``{"telemetry": {name: [points]}}``), which is
+    grouped per component, so points are yielded component by component.
+    """
+    stream = _IncrementalJson(fh)
+    fmt = fmt or detect_format(stream.head())
+    if fmt == BACKEND_DUMP:
+        yield from _iter_dump(stream)
+    elif fmt == JSONL:
+        yield from _iter_jsonl(fh, stream)
+    else:
+        raise ValueError(f"Unknown recording format '{fmt}' (expected one of {', '.join(FORMATS)})")
+
+
+def _iter_jsonl(fh: IO[str], stream: "_IncrementalJson") -> Iterator[ComponentTelemetry]:
+    for line in stream.drain_lines(fh):
+        line = line.strip()
+        if not line:
+            continue
+        record = json.loads(line)
+        if "components" in record:
+            timestamp = record.get("timestamp")
+            for component in record["components"]:
+                telemetry = ComponentTelemetry(**component)
+                if timestamp and "timestamp" not in telemetry.metadata:
+                    telemetry.metadata["timestamp"] = timestamp
+                yield telemetry
+        else:
+            yield ComponentTelemetry(**record)
+
+
+def _iter_dump(stream: "_IncrementalJson") -> Iterator[ComponentTelemetry]:
+    stream.expect("{")
+    for key in stream.keys():
+        if key != "telemetry":
+            stream.value()
+            continue
+        stream.expect("{")
+        for name in stream.keys():
+            stream.expect("[")
+            for point in stream.items():
+                telemetry = _from_dump_point(name, point)
+                if telemetry is not None:
+                    yield telemetry
+
+
+def _from_dump_point(name: str, point: Dict[str, Any]) -> Optional[ComponentTelemetry]:
+    value = point.get("value")
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    metadata = {key: point[key] for key in ("timestamp", "active") if key in point}
+    return ComponentTelemetry(name=name, value=float(value), status=point.get("status"), metadata=metadata)
+
+
+def point_timestamp(component: ComponentTelemetry) -> Optional[float]:
+    """Epoch seconds of the point's ``timestamp`` metadata, or ``None`` if missing or unparseable."""
+    raw = component.metadata.get("timestamp")
+    if not isinstance(raw, str):
+        return None
+    try:
+        return datetime.fromisoformat(raw.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+def batches(points: Iterable[ComponentTelemetry], size: int) -> Iterator[List[ComponentTelemetry]]:
+    batch: List[ComponentTelemetry] = []
+    for point in points:
+        batch.append(point)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class HistoryEnricher:
+    """Fills ``history``/``historyMean``/``historyStd`` from each component's recent points.
+
+    Recordings only carry raw values, while the models read rolling statistics
+    from metadata. State is one bounded window per component.
+    """
+
+    def __init__(self, window: int) -> None:
+        self.window = window
+        self._history: Dict[str, Deque[float]] = {}
+
+    def __call__(self, component: ComponentTelemetry) -> ComponentTelemetry:
+        history = self._history.get(component.name)
+        if history is None:
+            history = self._history[component.name] = deque(maxlen=self.window)
+        if history and "history" not in component.metadata:
+            values = list(history)
+            component.metadata["history"] = values
+            component.metadata.setdefault("historyMean", statistics.fmean(values))
+            component.metadata.setdefault("historyStd", statistics.pstdev(values) if len(values) > 1 else 1.0)
+        history.append(float(component.value))
+        return component
+
+
+class _IncrementalJson:
+    """Minimal pull parser that decodes one JSON value at a time from a text stream.
+
+    A single value (one dump point, or a skipped top-level field) may span at
+    most ``max_value`` characters, which bounds the buffer on malformed input.
+    """
+
+    def __init__(self, fh: IO[str], chunk_size: int = 1 << 16, max_value: int = 1 << 20) -> None:
+        self.fh = fh
+        self.chunk_size = chunk_size
+        self.max_value = max_value
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+
+    def head(self) -> str:
+        if not self.buffer:
+            self._fill()
+        return self.buffer
+
+    def drain_lines(self, fh: IO[str]) -> Iterator[str]:
+        # Hand the already-buffered text back before switching to line reads.
+        pending = self.buffer[self.pos:]
+        self.buffer, self.pos = "", 0
+        if pending:
+            if not pending.endswith("\n"):
+                pending += fh.readline()
+            yield from pending.splitlines()
+        yield from fh
+
+    def _fill(self) -> bool:
+        data = self.fh.read(self.chunk_size)
+        if not data:
+            return False
+        self.buffer = self.buffer[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Malformed recording: expected '{char}', found '{found or 'EOF'}'")
+        self.pos += 1
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                result, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError as exc:
+                # A truncated value decodes once more text arrives; a malformed one never
+                # does, so stop reading ahead once it is longer than any real value.
+                if len(self.buffer) - self.pos > self.max_value:
+                    raise ValueError(
+                        f"Malformed recording: no JSON value within {self.max_value} characters ({exc.msg})"
+                    ) from exc
+                if not self._fill():
+                    raise
+                continue
+            # A number at the end of the buffer may continue in the next chunk.
+            if end == len(self.buffer) and self._fill():
+                continue
+            self.pos = end
+            return result
+
+    def keys(self) -> Iterator[str]:
+        """Iterates object keys; the caller must consume each value before advancing."""
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            yield key
+            separator = self.peek()
+            self.pos += 1
+            if separator == "}":
+                return
+            if separator != ",":
+                raise ValueError(f"Malformed recording: unexpected '{separator or 'EOF'}' in object")
+
+    def items(self) -> Iterator[Any]:
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            separator = self.peek()
+            self.pos += 1
+            if separator == "]":
+                return
+            if separator != ",":
+                raise ValueError(f"Malformed recording: unexpected '{separator or 'EOF'}' in array")
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from typing import Optional
+
+import numpy as np
+
+SEVERITY_LEVELS = ["low", "medium", "high", "critical"]
+
+
+def severity_codes(scores: np.ndarray, medium: float, high: float, critical: float) -> np.ndarray:
+    """Maps scores onto ``SEVERITY_LEVELS`` indices given ascending cut-offs."""
+    scores = np.asarray(scores, dtype=float)
+    return (scores >= medium).astype(np.int8) + (scores >= high) + (scores >= critical)
+
+
+def select(
+    scores: np.ndarray,
+    codes: np.ndarray,
+    min_severity: Optional[str] = None,
+    top_k: Optional[int] = None,
+) -> np.ndarray:
+    """Returns the row indices to report: at or above ``min_severity``, best ``top_k`` by score.
+
+    Rows keep their input order unless ``top_k`` is set, in which case they are
+    ordered by descending score, ties in input order.
+    """
+    indices = np.arange(len(scores))
+    if min_severity is not None:
+        indices = indices[codes >= SEVERITY_LEVELS.index(min_severity)]
+    if top_k is not None:
+        ranked = -np.asarray(scores, dtype=float)[indices]
+        if top_k < len(indices):
+            # Keep everything strictly better than the k-th score plus the earliest ties,
+            # so the selection is deterministic (and reproducible across shards).
+            kth = np.partition(ranked, top_k - 1)[top_k - 1]
+            better = np.flatnonzero(ranked < kth)
+            ties = np.flatnonzero(ranked == kth)[: top_k - len(better)]
+            keep = np.sort(np.concatenate([better, ties]))
+            indices, ranked = indices[keep], ranked[keep]
+        indices = indices[np.argsort(ranked, kind="stable")]
+    return indices
@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, TypeVar
+
+from utils import tracing
+
+SAFETY = 0
+INTERACTIVE = 1
+ANALYTICS = 2
+PRIORITY_NAMES = ["safety", "interactive", "analytics"]
+
+T = TypeVar("T")
+
+_local = threading.local()
+
+
+@dataclass
+class _Job:
+    priority: int
+    fn: Callable[..., Any]
+    args: tuple
+    context: contextvars.Context
+    future: Future = field(default_factory=Future)
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+class _ClassStats:
+    def __init__(self, history: int) -> None:
+        self.completed = 0
+        self.preemptions = 0
+        self.paused_s = 0.0
+        self.queue_ms: Deque[float] = deque(maxlen=history)
+        self.latency_ms: Deque[float] = deque(maxlen=history)
+
+
+class PriorityScheduler:
+    """Runs endpoint work on a worker pool with strict priority classes.
+
+    ``reserved_safety`` workers only ever take safety jobs, so offline/E-stop
+    evaluations never wait behind analytics for a thread. Shared workers take
+    the highest-priority queued job. At most ``analytics_limit`` analytics jobs
+    run at once. Running analytics loops wrapped in ``preemptible`` pause at
+    chunk boundaries while any higher-priority job is queued or running, for at
+    most ``max_pause_ms`` per checkpoint so a steady stream of higher-priority
+    work cannot starve them.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        reserved_safety: int,
+        analytics_limit: int,
+        max_pause_ms: float = 50.0,
+        history: int = 1024,
+    ) -> None:
+        self.reserved_safety = max(reserved_safety, 1)
+        self.workers = max(workers, self.reserved_safety + 2)
+        shared = self.workers - self.reserved_safety
+        # Keep at least one shared worker free of analytics for interactive requests.
+        self.analytics_limit = max(1, min(analytics_limit, shared - 1))
+        self.max_pause_s = max(max_pause_ms, 0.0) / 1000.0
+
+        self._cond = threading.Condition()
+        self._queues: List[Deque[_Job]] = [deque() for _ in PRIORITY_NAMES]
+        self._running = [0 for _ in PRIORITY_NAMES]
+        self._stats = [_ClassStats(history) for _ in PRIORITY_NAMES]
+        self._threads: List[threading.Thread] = []
+
+    def submit(self, priority: int, fn: Callable[..., T], *args: Any) -> "Future[T]":
+        self._ensure_workers()
+        job = _Job(priority=priority, fn=fn, args=args, context=contextvars.copy_context())
+        with self._cond:
+            self._queues[priority].append(job)
+            self._cond.notify_all()
+        return job.future
+
+    async def run(self, priority: int, fn: Callable[..., T], *args: Any) -> T:
+        return await asyncio.wrap_future(self.submit(priority, fn, *args))
+
+    def enter(self, priority: int) -> None:
+        """Counts work that runs outside the pool, such as a micro-batched request, as running."""
+        with self._cond:
+            self._running[priority] += 1
+
+    def leave(self, priority: int, enqueued_at: float, started_at: float) -> None:
+        """Ends work counted by ``enter`` and records its queue wait and latency."""
+        finished = time.perf_counter()
+        with self._cond:
+            self._running[priority] -= 1
+            self._record(priority, enqueued_at, started_at, finished)
+            self._cond.notify_all()
+
+    def checkpoint(self, priority: int) -> None:
+        """Blocks while any job of a higher priority class is queued or running.
+
+        The wait is capped at ``max_pause_s``, so every checkpoint makes progress.
+        """
+        started: Optional[float] = None
+        with self._cond:
+            while self._higher_pending(priority):
+                if started is None:
+                    started = time.perf_counter()
+                remaining = started + self.max_pause_s - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            if started is not None:
+                stats = self._stats[priority]
+                stats.preemptions += 1
+                stats.paused_s += time.perf_counter() - started
+
+    def stats(self) -> Dict[str, object]:
+        with self._cond:
+            classes = {}
+            for priority, name in enumerate(PRIORITY_NAMES):
+                stats = self._stats[priority]
+                classes[name] = {
+                    "queued": len(self._queues[priority]),
+                    "running": self._running[priority],
+                    "completed": stats.completed,
+                    "preemptions": stats.preemptions,
+                    "pausedMs": round(stats.paused_s * 1000.0, 3),
+                    "queueMs": _summary(stats.queue_ms),
+                    "latencyMs": _summary(stats.latency_ms),
+                }
+            return {
+                "workers": self.workers,
+                "reservedSafety": self.reserved_safety,
+                "analyticsLimit": self.analytics_limit,
+                "maxPauseMs": round(self.max_pause_s * 1000.0, 3),
+                "classes": classes,
+            }
+
+    def _higher_pending(self, priority: int) -> bool:
+        return any(self._queues[p] or self._running[p] for p in range(priority))
+
+    def _ensure_workers(self) -> None:
+        if self._threads:
+            return
+        with self._cond:
+            if self._threads:
+                return
+            for index in range(self.workers):
+                reserved = index < self.reserved_safety
+                thread = threading.Thread(
+                    target=self._work,
+                    args=(reserved,),
+                    name=f"scheduler-{'safety' if reserved else 'shared'}-{index}",
+                    daemon=True,
+                )
+                self._threads.append(thread)
+                thread.start()
+
+    def _next_job(self, reserved: bool) -> _Job:
+        with self._cond:
+            while True:
+                if self._queues[SAFETY]:
+                    job = self._queues[SAFETY].popleft()
+                elif reserved:
+                    job = None
+                elif self._queues[INTERACTIVE]:
+                    job = self._queues[INTERACTIVE].popleft()
+                elif self._queues[ANALYTICS] and self._running[ANALYTICS] < self.analytics_limit:
+                    job = self._queues[ANALYTICS].popleft()
+                else:
+                    job = None
+                if job is not None:
+                    self._running[job.priority] += 1
+                    return job
+                self._cond.wait()
+
+    def _work(self, reserved: bool) -> None:
+        _local.scheduler = self
+        while True:
+            job = self._next_job(reserved)
+            started = time.perf_counter()
+            _local.priority = job.priority
+            try:
+                result = job.context.run(self._execute, job, started)
+            except BaseException as exc:  # handed to the awaiting request
+                job.future.set_exception(exc)
+            else:
+                job.future.set_result(result)
+            finally:
+                finished = time.perf_counter()
+                with self._cond:
+                    self._running[job.priority] -= 1
+                    self._record(job.priority, job.enqueued_at, started, finished)
+                    self._cond.notify_all()
+
+    def _record(self, priority: int, enqueued_at: float, started_at: float, finished_at: float) -> None:
+        stats = self._stats[priority]
+        stats.completed += 1
+        stats.queue_ms.append((started_at - enqueued_at) * 1000.0)
+        stats.latency_ms.append((finished_at - enqueued_at) * 1000.0)
+
+    @staticmethod
+    def _execute(job: _Job, started: float) -> Any:
+        tracing.add(f"queue.{PRIORITY_NAMES[job.priority]}", started - job.enqueued_at)
+        return job.fn(*job.args)
+
+
+def checkpoint() -> None:
+    """Yields to higher-priority work when called from a scheduled job; a no-op elsewhere."""
+    scheduler = getattr(_local, "scheduler", None)
+    if scheduler is not None:
+        scheduler.checkpoint(_local.priority)
+
+
+def preemptible(items: Iterable[T], chunk_size: int) -> Iterator[T]:
+    """Iterates ``items``, offering to yield to higher-priority work every ``chunk_size`` items."""
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be positive")
+    for index, item in enumerate(items):
+        if index and index % chunk_size == 0:
+            checkpoint()
+        yield item
+
+
+def _summary(values: Deque[float]) -> Dict[str, float]:
+    ordered = sorted(values)
+    if not ordered:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+
+    def pick(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 3)
+
+    return {"p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99), "max": round(ordered[-1], 3)}
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import time
+from contextlib import nullcontext
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+_current: ContextVar[Optional["Trace"]] = ContextVar("trace", default=None)
+_DISABLED = nullcontext()
+
+
+class Trace:
+    """Per-request accumulator of named stage durations."""
+
+    __slots__ = ("started", "debug", "spans")
+
+    def __init__(self, debug: bool = False) -> None:
+        self.started = time.perf_counter()
+        self.debug = debug
+        self.spans: Dict[str, List[float]] = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        entry = self.spans.get(name)
+        if entry is None:
+            self.spans[name] = [seconds, 1]
+        else:
+            entry[0] += seconds
+            entry[1] += 1
+
+    def timings(self) -> Dict[str, float]:
+        timings = {name: round(seconds * 1000.0, 3) for name, (seconds, _) in self.spans.items()}
+        timings["total"] = round((time.perf_counter() - self.started) * 1000.0, 3)
+        return timings
+
+    def server_timing(self) -> str:
+        return ", ".join(f"{name};dur={duration}" for name, duration in self.timings().items())
+
+
+class _Span:
+    __slots__ = ("trace", "name", "started")
+
+    def __init__(self, trace: Trace, name: str) -> None:
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self) -> "_Span":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.trace.add(self.name, time.perf_counter() - self.started)
+
+
+def span(name: str):
+    """Times the enclosed block when the current request is traced; a no-op otherwise."""
+    trace = _current.get()
+    return _DISABLED if trace is None else _Span(trace, name)
+
+
+def add(name: str, seconds: float) -> None:
+    trace = _current.get()
+    if trace is not None:
+        trace.add(name, seconds)
+
+
+def mark(name: str) -> None:
+    """Records the time from the start of the request until now as ``name``."""
+    trace = _current.get()
+    if trace is not None:
+        trace.add(name, time.perf_counter() - trace.started)
+
+
+def attach_debug(payload: Dict[str, Any]) -> Dict[str, Any]:
+    trace = _current.get()
+    if trace is not None and trace.debug:
+        payload["debug"] = {"timings": trace.timings()}
+    return payload
+
+
+class TracingMiddleware:
+    """ASGI middleware that traces requests and reports stages in a ``Server-Timing`` header.
+
+    Tracing is on for every request when ``enabled`` is set, or per request with
+    ``?trace=1`` / an ``X-Trace`` header. ``?trace=debug`` also adds the timings
+    to the JSON body. It also counts requests for an armed ``profiler``.
+    Untraced requests pass straight through.
+    """
+
+    def __init__(self, app, enabled: bool = False, profiler=None) -> None:
+        self.app = app
+        self.enabled = enabled
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        generation = (
+            self.profiler.request_started()
+            if self.profiler is not None and self.profiler.armed and not scope["path"].startswith("/debug")
+            else None
+        )
+        mode = self._mode(scope)
+        if mode is None and generation is None:
+            await self.app(scope, receive, send)
+            return
+
+        token = _current.set(Trace(debug=mode == "debug")) if mode else None
+        trace = _current.get()
+
+        async def send_with_timing(message) -> None:
+            if trace is not None and message["type"] == "http.response.start":
+                headers: List[Tuple[bytes, bytes]] = list(message.get("headers", []))
+                headers.append((b"server-timing", trace.server_timing().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            if token is not None:
+                _current.reset(token)
+            if generation is not None:
+                self.profiler.request_finished(generation)
+
+    def _mode(self, scope) -> Optional[str]:
+        query = scope.get("query_string", b"")
+        if query and b"trace=" in query:
+            value = parse_qs(query.decode("latin-1")).get("trace", [""])[-1]
+            if value == "debug":
+                return "debug"
+            if value not in ("", "0", "false"):
+                return "header"
+        if self.enabled:
+            return "header"
+        for name, _ in scope.get("headers", []):
+            if name == b"x-trace":
+                return "header"
+        return None
@@ -1780,6 +1780,62 @@ app.post('/api/ai/parameter/evaluate', async (req, res) => {
     }
 });
 
+app.post('/api/ai/parameter/sweep', async (req, res) => {
+    try {
+        if (!AI_ENABLED) {
+            return res.status(503).json({ success: false, error: 'AI services disabled' });
+        }
+
+        const incoming = Array.isArray(req.body?.sweeps) ? req.body.sweeps : (req.body ? [req.body] : []);
+        const sweeps = [];
+
+        incoming.forEach(entry => {
+            if (!entry || !entry.componentId || entry.parameter === undefined) return;
+            const component = componentStore.get(entry.componentId) || {
+                name: entry.componentId,
+                type: entry.componentType || 'Unknown'
+            };
+            const profile = resolveParameterProfile(component, entry.parameter) || {};
+            const bounds = computeRecommendedBounds(profile);
+            const sweep = {
+                componentId: component.name,
+                componentType: component.type,
+                parameter: entry.parameter,
+                defaultValue: entry.defaultValue !== undefined ? entry.defaultValue : profile.default,
+                minValue: entry.minValue !== undefined ? entry.minValue : profile.min,
+                maxValue: entry.maxValue !== undefined ? entry.maxValue : profile.max,
+                recommendedMin: entry.recommendedMin !== undefined ? entry.recommendedMin : bounds.recommendedMin,
+                recommendedMax: entry.recommendedMax !== undefined ? entry.recommendedMax : bounds.recommendedMax
+            };
+
+            if (Array.isArray(entry.values)) {
+                sweep.values = entry.values.map(normalizeProposedValue).filter(value => value !== null);
+            } else {
+                // Without an explicit grid, sweep the parameter's full configured range.
+                sweep.start = entry.start !== undefined ? entry.start : sweep.minValue;
+                sweep.stop = entry.stop !== undefined ? entry.stop : sweep.maxValue;
+                if (entry.steps !== undefined) {
+                    sweep.steps = entry.steps;
+                }
+            }
+            if (!sweep.values && (sweep.start === undefined || sweep.stop === undefined)) {
+                return;
+            }
+            sweeps.push(sweep);
+        });
+
+        if (!sweeps.length) {
+            return res.status(400).json({ success: false, error: 'No valid parameter sweeps provided' });
+        }
+
+        const response = await pythonClient.post('/ai/parameter/sweep', { sweeps });
+        res.json(response);
+    } catch (error) {
+        console.error('Error sweeping parameter risk:', error);
+        res.status(500).json({ success: false, error: error.message || 'Parameter sweep failed' });
+    }
+});
+
 // GET /api/ai/command/status - Get status of AI-generated commands
 app.get('/api/ai/command/status', (req, res) => {
     try {